@@ -1,42 +1,99 @@
-from flask import Flask, request, jsonify, render_template
-from flask_cors import CORS
+from quart import Quart, request, jsonify, render_template
+from quart.utils import run_sync
+from quart.json.provider import DefaultJSONProvider
+from quart_cors import cors
+import orjson
+import msgspec
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from api.emergency_service import EmergencyResponseService, EmergencyAnalytics
+from api.tasks import simulate_emergency_response
+from api.batcher import EmergencyBatcher
+from api.schemas import EmergencyIn, LocationIn, RouteIn, SimulationIn
+from api.logging_setup import configure_logging, shutdown_logging
+from config import Config
+from redis import Redis
+from rq import Queue
+from rq.job import Job
+from rq.exceptions import NoSuchJobError
 from datetime import datetime
 import json
 import traceback
 
-app = Flask(__name__)
-CORS(app)  # Enable CORS for frontend integration
+class OrjsonProvider(DefaultJSONProvider):
+    """JSON provider backed by orjson, encodes numpy values and datetimes natively"""
+    
+    options = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NAIVE_UTC | orjson.OPT_NON_STR_KEYS
+    
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self.default, option=self.options).decode()
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+# Log records are written by a background listener, not the request threads
+configure_logging(Config.LOG_LEVEL)
+
+app = Quart(__name__)
+app.json = OrjsonProvider(app)
+app = cors(app)  # Enable CORS for frontend integration
 
 # Initialize emergency service
 emergency_service = EmergencyResponseService()
 analytics = EmergencyAnalytics(emergency_service)
 
+# Long-running simulations are handed to RQ workers
+redis_conn = Redis.from_url(Config.REDIS_URL)
+simulation_queue = Queue('simulations', connection=redis_conn)
+
+# Emergency calls arriving close together share real-time data lookups
+emergency_batcher = EmergencyBatcher(
+    emergency_service.handle_emergency_calls_batch,
+    max_batch=Config.EMERGENCY_BATCH_SIZE,
+    max_wait_ms=Config.EMERGENCY_BATCH_WAIT_MS
+)
+
+async def decode_body(schema):
+    """Parse and validate the JSON request body against a msgspec schema"""
+    return msgspec.json.decode(await request.get_data(), type=schema)
+
+def invalid_body(error, required_fields):
+    return jsonify({
+        'error': 'Missing or invalid fields',
+        'message': str(error),
+        'required': required_fields
+    }), 400
+
+@app.before_serving
+async def start_batcher():
+    emergency_batcher.start()
+
+@app.after_serving
+async def stop_batcher():
+    await emergency_batcher.stop()
+    # Clients of this loop, then those of the loop serving blocking callers
+    await emergency_service.data_collector.close()
+    await run_sync(emergency_service.data_collector.close_sync)()
+    shutdown_logging()
+
 @app.route('/')
-def index():
+async def index():
     """Serve main dashboard"""
-    return render_template('index.html')
+    return await render_template('index.html')
 
 @app.route('/api/emergency', methods=['POST'])
-def handle_emergency():
+async def handle_emergency():
     """Handle new emergency call"""
     try:
-        emergency_data = request.json
-        
-        # Validate required fields
-        required_fields = ['latitude', 'longitude']
-        if not all(field in emergency_data for field in required_fields):
-            return jsonify({
-                'error': 'Missing required fields',
-                'required': required_fields
-            }), 400
+        try:
+            emergency_data = msgspec.to_builtins(await decode_body(EmergencyIn))
+        except msgspec.DecodeError as e:
+            return invalid_body(e, ['latitude', 'longitude'])
         
         # Process emergency
-        response = emergency_service.handle_emergency_call(emergency_data)
+        response = await emergency_batcher.submit(emergency_data)
         
         # Log response for analytics
         analytics.log_response(emergency_data, response)
@@ -55,22 +112,18 @@ def handle_emergency():
         }), 500
 
 @app.route('/api/ambulance/location', methods=['POST'])
-def update_ambulance_location():
+async def update_ambulance_location():
     """Update ambulance location"""
     try:
-        location_data = request.json
-        
-        required_fields = ['ambulance_id', 'latitude', 'longitude']
-        if not all(field in location_data for field in required_fields):
-            return jsonify({
-                'error': 'Missing required fields',
-                'required': required_fields
-            }), 400
+        try:
+            location_data = await decode_body(LocationIn)
+        except msgspec.DecodeError as e:
+            return invalid_body(e, ['ambulance_id', 'latitude', 'longitude'])
         
         result = emergency_service.update_ambulance_location(
-            location_data['ambulance_id'],
-            location_data['latitude'],
-            location_data['longitude']
+            location_data.ambulance_id,
+            location_data.latitude,
+            location_data.longitude
         )
         
         return jsonify({
@@ -85,22 +138,27 @@ def update_ambulance_location():
         }), 500
 
 @app.route('/api/predict/traffic', methods=['POST'])
-def predict_traffic():
+async def predict_traffic():
     """Predict traffic conditions for given route"""
     try:
-        route_data = request.json
+        try:
+            route_data = await decode_body(RouteIn)
+        except msgspec.DecodeError as e:
+            return invalid_body(e, ['origin', 'destination'])
         
-        origin = (route_data['origin']['lat'], route_data['origin']['lon'])
-        destination = (route_data['destination']['lat'], route_data['destination']['lon'])
+        origin = (route_data.origin.lat, route_data.origin.lon)
+        destination = (route_data.destination.lat, route_data.destination.lon)
         
-        # Collect current data
-        current_data = emergency_service.data_collector.collect_all_data(origin, destination)
+        # Collect current data, forecast trends feed the prediction
+        current_data = await emergency_service.data_collector.collect_all_data(
+            origin, destination, include_forecast=True
+        )
         
         # Preprocess for prediction
-        features = emergency_service.preprocessor.preprocess_single_sample(current_data)
+        features = await run_sync(emergency_service.preprocessor.preprocess_single_sample)(current_data)
         
         # Make predictions for different time horizons
-        predictions = emergency_service.traffic_predictor.predict_future_traffic(
+        predictions = await run_sync(emergency_service.traffic_predictor.predict_future_traffic)(
             features, forecast_minutes=[15, 30, 45, 60]
         )
         
@@ -119,19 +177,38 @@ def predict_traffic():
         }), 500
 
 @app.route('/api/hospitals', methods=['GET'])
-def get_hospitals():
+async def get_hospitals():
     """Get all available hospitals"""
     try:
-        hospitals = emergency_service.route_optimizer.hospitals
-        
-        # Add current status for each hospital
-        for hospital in hospitals:
-            # In real implementation, this would fetch real-time data
-            hospital['current_status'] = {
-                'beds_available': hospital['capacity'] - int(hospital['capacity'] * 0.7),
-                'emergency_queue': hospital['current_wait_time'],
-                'last_updated': datetime.now().isoformat()
+        # Optional nearest-hospital filter: ?lat=..&lon=..&radius_km=..&count=..&condition=..
+        lat = request.args.get('lat', type=float)
+        lon = request.args.get('lon', type=float)
+        if lat is not None and lon is not None:
+            hospital_list = await run_sync(emergency_service.find_nearby_hospitals)(
+                lat, lon,
+                radius_km=request.args.get('radius_km', 10, type=float),
+                count=request.args.get('count', 5, type=int),
+                condition=request.args.get('condition')
+            )
+        else:
+            hospital_list = emergency_service.route_optimizer.hospitals
+        
+        beds_available = emergency_service.hospital_beds_available
+        last_updated = datetime.now().isoformat()
+        
+        # Add current status for each hospital without touching the shared list
+        # In real implementation, this would fetch real-time data
+        hospitals = [
+            {
+                **hospital,
+                'current_status': {
+                    'beds_available': beds_available[hospital['id']],
+                    'emergency_queue': hospital['current_wait_time'],
+                    'last_updated': last_updated
+                }
             }
+            for hospital in hospital_list
+        ]
         
         return jsonify({
             'status': 'success',
@@ -145,20 +222,23 @@ def get_hospitals():
         }), 500
 
 @app.route('/api/routes/optimize', methods=['POST'])
-def optimize_route():
+async def optimize_route():
     """Get optimized route options"""
     try:
-        route_request = request.json
+        try:
+            route_request = await decode_body(RouteIn)
+        except msgspec.DecodeError as e:
+            return invalid_body(e, ['origin', 'destination'])
         
-        origin = (route_request['origin']['lat'], route_request['origin']['lon'])
-        destination = (route_request['destination']['lat'], route_request['destination']['lon'])
-        vehicle_type = route_request.get('vehicle_type', 'ambulance')
+        origin = (route_request.origin.lat, route_request.origin.lon)
+        destination = (route_request.destination.lat, route_request.destination.lon)
+        vehicle_type = route_request.vehicle_type
         
         # Collect current conditions
-        current_data = emergency_service.data_collector.collect_all_data(origin, destination)
+        current_data = await emergency_service.data_collector.collect_all_data(origin, destination)
         
         # Get route options
-        route_options = emergency_service.route_optimizer.get_multiple_route_options(
+        route_options = await run_sync(emergency_service.route_optimizer.get_multiple_route_options)(
             origin, destination, current_data['contextual'], 
             num_routes=3, vehicle_type=vehicle_type
         )
@@ -166,7 +246,7 @@ def optimize_route():
         # Add detailed statistics for each route
         detailed_routes = []
         for route in route_options:
-            stats = emergency_service.route_optimizer.calculate_route_stats(
+            stats = await run_sync(emergency_service.route_optimizer.calculate_route_stats)(
                 route['path'], current_data['contextual']
             )
             
@@ -189,11 +269,11 @@ def optimize_route():
         }), 500
 
 @app.route('/api/analytics/report', methods=['GET'])
-def get_analytics_report():
+async def get_analytics_report():
     """Get system performance analytics"""
     try:
         days = request.args.get('days', 30, type=int)
-        report = analytics.generate_performance_report(time_period_days=days)
+        report = await run_sync(analytics.generate_performance_report)(time_period_days=days)
         
         return jsonify({
             'status': 'success',
@@ -207,7 +287,7 @@ def get_analytics_report():
         }), 500
 
 @app.route('/api/system/status', methods=['GET'])
-def get_system_status():
+async def get_system_status():
     """Get current system status"""
     try:
         status = emergency_service.get_system_status()
@@ -223,17 +303,61 @@ def get_system_status():
         }), 500
 
 @app.route('/api/simulate', methods=['POST'])
-def run_simulation():
-    """Run emergency response simulation"""
+async def run_simulation():
+    """Queue emergency response simulation, poll /api/simulate/<job_id> for the result"""
+    try:
+        try:
+            sim_params = await decode_body(SimulationIn)
+        except msgspec.DecodeError as e:
+            return invalid_body(e, [])
+        num_emergencies = sim_params.num_emergencies
+        
+        job = await run_sync(simulation_queue.enqueue)(
+            simulate_emergency_response, num_emergencies, result_ttl=3600
+        )
+        
+        return jsonify({
+            'status': 'success',
+            'data': {
+                'job_id': job.id,
+                'job_status': 'queued'
+            }
+        }), 202
+        
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500
+
+@app.route('/api/simulate/<job_id>', methods=['GET'])
+async def get_simulation_result(job_id):
+    """Get status or result of a queued simulation"""
+    try:
+        job = await run_sync(Job.fetch)(job_id, connection=redis_conn)
+    except NoSuchJobError:
+        return jsonify({
+            'status': 'error',
+            'message': 'Simulation job not found'
+        }), 404
+    
     try:
-        sim_params = request.json
-        num_emergencies = sim_params.get('num_emergencies', 5)
+        job_status = await run_sync(job.get_status)()
         
-        results = emergency_service.simulate_emergency_response(num_emergencies)
+        if job_status == 'failed':
+            return jsonify({
+                'status': 'error',
+                'message': 'Simulation failed',
+                'data': {'job_id': job.id, 'job_status': job_status}
+            }), 500
         
         return jsonify({
             'status': 'success',
-            'data': results
+            'data': {
+                'job_id': job.id,
+                'job_status': job_status,
+                'results': job.result if job_status == 'finished' else None
+            }
         })
         
     except Exception as e:
@@ -243,7 +367,7 @@ def run_simulation():
         }), 500
 
 @app.route('/api/test', methods=['GET'])
-def test_endpoint():
+async def test_endpoint():
     """Test endpoint to verify API is working"""
     return jsonify({
         'status': 'success',
@@ -253,14 +377,14 @@ def test_endpoint():
     })
 
 @app.errorhandler(404)
-def not_found(error):
+async def not_found(error):
     return jsonify({
         'status': 'error',
         'message': 'Endpoint not found'
     }), 404
 
 @app.errorhandler(500)
-def internal_error(error):
+async def internal_error(error):
     return jsonify({
         'status': 'error',
         'message': 'Internal server error'
@@ -274,11 +398,14 @@ if __name__ == '__main__':
     print("   POST /api/emergency - Handle emergency call")
     print("   POST /api/ambulance/location - Update ambulance location") 
     print("   POST /api/predict/traffic - Predict traffic conditions")
-    print("   GET  /api/hospitals - Get hospital information")
+    print("   GET  /api/hospitals - Get hospital information (?lat=&lon= for nearest)")
     print("   POST /api/routes/optimize - Get optimized routes")
     print("   GET  /api/analytics/report - Get performance analytics")
     print("   GET  /api/system/status - Get system status")
-    print("   POST /api/simulate - Run simulation")
+    print("   POST /api/simulate - Queue simulation")
+    print("   GET  /api/simulate/<job_id> - Get simulation result")
     print("   GET  /api/test - Test API connectivity")
     
+    # For production run under an ASGI server instead:
+    #   hypercorn app:app --workers 1 --worker-class asyncio
     app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
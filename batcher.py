@@ -0,0 +1,81 @@
+import asyncio
+import contextlib
+
+class EmergencyBatcher:
+    """Groups emergency calls arriving within a short window into one batch"""
+    
+    def __init__(self, handler, max_batch=16, max_wait_ms=20):
+        self.handler = handler  # blocking callable: list of calls -> list of responses
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self._queue = None
+        self._worker = None
+        self._in_flight = set()  # batch tasks still being handled
+        self._handling = None  # one batch in the handler at a time
+    
+    def start(self):
+        """Start draining the queue on the running event loop"""
+        self._queue = asyncio.Queue()
+        self._handling = asyncio.Lock()
+        self._worker = asyncio.get_running_loop().create_task(self._run())
+    
+    async def stop(self):
+        """Stop the background drain task and any batches still in flight"""
+        if self._worker is not None:
+            self._worker.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._worker
+        self._worker = None
+        
+        for task in self._in_flight:
+            task.cancel()
+        await asyncio.gather(*self._in_flight, return_exceptions=True)
+    
+    async def submit(self, emergency_data):
+        """Queue one emergency call and wait for its response"""
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((emergency_data, future))
+        return await future
+    
+    async def _next_batch(self):
+        """Wait for one call, then take more until the batch is full or the window closes"""
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self.max_wait
+        
+        while len(batch) < self.max_batch:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        
+        return batch
+    
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._next_batch()
+            # Handle each batch in its own task so the next one drains meanwhile,
+            # the handler itself runs one batch at a time
+            task = loop.create_task(self._handle_batch(batch))
+            self._in_flight.add(task)
+            task.add_done_callback(self._in_flight.discard)
+    
+    async def _handle_batch(self, batch):
+        emergencies = [emergency for emergency, _ in batch]
+        
+        try:
+            async with self._handling:
+                responses = await asyncio.to_thread(self.handler, emergencies)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        
+        for (_, future), response in zip(batch, responses):
+            if not future.done():
+                future.set_result(response)
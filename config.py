@@ -12,11 +12,16 @@ class Config:
     # Database Configuration
     DATABASE_URL = os.getenv('DATABASE_URL', 'sqlite:///emergency_routes.db')
     REDIS_URL = os.getenv('REDIS_URL', 'redis://localhost:6379')
+    REDIS_RETRY_SECONDS = 30       # skip Redis this long after a failure
     
     # Model Parameters
     TRAFFIC_PREDICTION_WINDOW = 30  # minutes
     MODEL_UPDATE_INTERVAL = 3600    # seconds (1 hour)
     ROUTE_CACHE_TTL = 300          # seconds (5 minutes)
+    ROUTE_CACHE_SIZE = 10000       # cached (location, hospital, conditions) route searches
+    WEATHER_CACHE_TTL = 300        # seconds (5 minutes)
+    TRAFFIC_CACHE_TTL = 60         # seconds
+    COLLECT_CACHE_TTL = 30         # seconds, in-process memo of collect_all_data
     
     # Geographic Bounds (Configure for your city)
     # Example: Bengaluru, India
@@ -31,6 +36,12 @@ class Config:
     MAX_RESPONSE_TIME = 20          # minutes
     AMBULANCE_SPEED_FACTOR = 1.3    # 30% faster than normal traffic
     CRITICAL_THRESHOLD = 5          # minutes for critical cases
+    MAX_DISPATCH_KM = 30            # hospitals further than this are not routed to
+    EMERGENCY_BATCH_SIZE = 16       # max calls handled together
+    EMERGENCY_BATCH_WAIT_MS = 20    # max time a call waits for its batch
+    SIMULATION_PARALLEL_MIN = 32    # simulations at least this large fan out to worker processes
+    SIMULATION_KEEP_RESULTS_MAX = 100  # larger simulations only keep summary statistics
+    SIMULATION_SLOWEST_K = 5        # slowest calls reported in each simulation summary
     
     # Model Training Parameters
     TRAIN_TEST_SPLIT = 0.2
@@ -40,4 +51,5 @@ class Config:
     # File Paths
     DATA_DIR = 'data'
     MODEL_DIR = 'models/trained_models'
-    LOG_DIR = 'logs'
\ No newline at end of file
+    LOG_DIR = 'logs'
+    LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
\ No newline at end of file
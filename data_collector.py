@@ -1,20 +1,191 @@
-import requests
+import asyncio
+import aiohttp
+import msgpack
+import orjson
+import redis
+import redis.asyncio as aioredis
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 import json
+import logging
+import os
 import time
+import threading
+from functools import lru_cache
+from typing import NamedTuple
+from cachetools import TTLCache
 from config import Config
+from numba_kernels import forecast_stats, route_bounds
+
+logger = logging.getLogger(__name__)
+
+class Bounds(NamedTuple):
+    """Geographic bounding box in degrees"""
+    north: float
+    south: float
+    east: float
+    west: float
+
+# Hour-of-day and weekday lookup tables
+RUSH_HOUR_TABLE = tuple(1 if (7 <= hour <= 10) or (17 <= hour <= 20) else 0 for hour in range(24))
+NIGHT_TABLE = tuple(1 if (22 <= hour or hour <= 6) else 0 for hour in range(24))
+WEEKEND_TABLE = (0, 0, 0, 0, 0, 1, 1)
+
+# School hours indexed by weekday * 24 + hour
+SCHOOL_HOURS_TABLE = tuple(
+    1 if weekday < 5 and 7 <= hour <= 17 else 0
+    for weekday in range(7) for hour in range(24)
+)
+
+# Redis incident store: GEO set of incident ids, records under incident:<id> as msgpack
+INCIDENT_GEO_KEY = 'incidents'
+INCIDENT_KEY_PREFIX = b'incident:'
+
+# Mock incidents used until the incident store is populated
+MOCK_INCIDENTS = [
+    {
+        'type': 'accident',
+        'severity': 'major',
+        'lat': 12.9716,
+        'lon': 77.5946,
+        'description': 'Vehicle breakdown on outer ring road',
+        'estimated_duration': 45  # minutes
+    },
+    {
+        'type': 'construction',
+        'severity': 'moderate',
+        'lat': 12.9344,
+        'lon': 77.6101,
+        'description': 'Road repair work',
+        'estimated_duration': 120  # minutes
+    }
+]
 
 class DataCollector:
     def __init__(self):
         self.config = Config()
         self.weather_api_key = self.config.OPENWEATHER_API_KEY
         self.maps_api_key = self.config.GOOGLE_MAPS_API_KEY
+        # HTTP sessions and Redis clients per event loop, a client is only ever
+        # used and closed on the loop that created it
+        self._sessions = {}
+        self._redis_clients = {}
+        # Redis outage state: failures are logged once, then Redis is skipped until retry time
+        self._redis_down = False
+        self._redis_retry_at = 0.0
+        self._redis_state_lock = threading.Lock()
         
-    def get_weather_data(self, lat, lon):
-        """Fetch current and forecast weather data"""
+        # Sync callers all run on one long-lived background loop, so its pooled
+        # clients survive between calls. Recreated after a fork, the thread does not.
+        self._sync_loop = None
+        self._sync_loop_pid = None
+        self._sync_loop_lock = threading.Lock()
+        self._contextual_for = lru_cache(maxsize=64)(self._build_contextual)
+        
+        # Recent collect_all_data results per ~100 m origin/destination cell.
+        # Callers run on several threads, each with its own event loop, so the
+        # cache has a thread lock and in-flight locks are tracked per loop.
+        self._collect_cache = TTLCache(maxsize=4096, ttl=self.config.COLLECT_CACHE_TTL)
+        self._collect_cache_lock = threading.Lock()
+        self._collect_locks = {}
+    
+    async def _get_session(self):
+        """Return the HTTP session bound to the running event loop"""
+        loop = asyncio.get_running_loop()
+        session = self._sessions.get(loop)
+        if session is None or session.closed:
+            # Pooled keep-alive connections so TLS sessions are reused across calls
+            connector = aiohttp.TCPConnector(limit=64, limit_per_host=16,
+                                             keepalive_timeout=30, ttl_dns_cache=300)
+            timeout = aiohttp.ClientTimeout(total=10, sock_connect=1.0, sock_read=3.0)
+            session = aiohttp.ClientSession(connector=connector, timeout=timeout)
+            self._sessions[loop] = session
+        return session
+    
+    async def close(self):
+        """Close the HTTP session and Redis client of the running event loop"""
+        loop = asyncio.get_running_loop()
+        session = self._sessions.pop(loop, None)
+        if session is not None and not session.closed:
+            await session.close()
+        redis_client = self._redis_clients.pop(loop, None)
+        if redis_client is not None:
+            await redis_client.close()
+    
+    async def _get_redis(self):
+        """Return the Redis client bound to the running event loop"""
+        loop = asyncio.get_running_loop()
+        redis_client = self._redis_clients.get(loop)
+        if redis_client is None:
+            redis_client = aioredis.Redis.from_url(self.config.REDIS_URL, socket_connect_timeout=0.5)
+            self._redis_clients[loop] = redis_client
+        return redis_client
+    
+    def _redis_backing_off(self):
+        return self._redis_down and time.monotonic() < self._redis_retry_at
+    
+    def _redis_failed(self, error):
+        """Log the start of a Redis outage once and back off before the next attempt"""
+        with self._redis_state_lock:
+            first_failure = not self._redis_down
+            self._redis_down = True
+            self._redis_retry_at = time.monotonic() + self.config.REDIS_RETRY_SECONDS
+        if first_failure:
+            logger.warning("Redis unavailable, retrying in %ds: %s", self.config.REDIS_RETRY_SECONDS, error)
+    
+    def _redis_succeeded(self):
+        if self._redis_down:
+            with self._redis_state_lock:
+                recovered = self._redis_down
+                self._redis_down = False
+            if recovered:
+                logger.info("Redis reachable again")
+    
+    async def _cache_get(self, key):
+        """Read a cached value from Redis, None on miss or when Redis is unavailable"""
+        if self._redis_backing_off():
+            return None
         try:
+            redis_client = await self._get_redis()
+            cached = await redis_client.get(key)
+        except redis.RedisError as e:
+            self._redis_failed(e)
+            return None
+        self._redis_succeeded()
+        return msgpack.unpackb(cached) if cached is not None else None
+    
+    async def _cache_set(self, key, value, ttl):
+        """Write a value to Redis as msgpack with an expiry"""
+        if self._redis_backing_off():
+            return
+        try:
+            redis_client = await self._get_redis()
+            await redis_client.set(key, msgpack.packb(value), ex=ttl)
+        except redis.RedisError as e:
+            self._redis_failed(e)
+            return
+        self._redis_succeeded()
+        
+    async def get_weather_data(self, lat, lon, now=None, *, include_forecast=False, fallback=True):
+        """Fetch current weather data, plus forecast data when include_forecast is set
+        
+        On failure returns default weather, or None when fallback is False.
+        """
+        if now is None:
+            now = datetime.now()
+        ts = now.timestamp()
+        
+        ttl = self.config.WEATHER_CACHE_TTL
+        prefix = 'wxf' if include_forecast else 'wx'
+        cache_key = f"{prefix}:{round(lat, 2)}:{round(lon, 2)}:{int(ts) // ttl}"
+        cached = await self._cache_get(cache_key)
+        if cached is not None:
+            return cached
+        
+        try:
+            session = await self._get_session()
+            
             # Current weather
             current_url = f"http://api.openweathermap.org/data/2.5/weather"
             current_params = {
@@ -24,8 +195,11 @@ class DataCollector:
                 'units': 'metric'
             }
             
-            current_response = requests.get(current_url, params=current_params)
-            current_data = current_response.json()
+            if not include_forecast:
+                current_data = await self._fetch_json(session, current_url, current_params)
+                weather_features = self._extract_weather_features(current_data, {}, ts)
+                await self._cache_set(cache_key, weather_features, ttl)
+                return weather_features
             
             # Forecast weather
             forecast_url = f"http://api.openweathermap.org/data/2.5/forecast"
@@ -37,17 +211,32 @@ class DataCollector:
                 'cnt': 8  # 24 hours forecast (3-hour intervals)
             }
             
-            forecast_response = requests.get(forecast_url, params=forecast_params)
-            forecast_data = forecast_response.json()
+            # Fire both weather requests together
+            current_data, forecast_data = await asyncio.gather(
+                self._fetch_json(session, current_url, current_params),
+                self._fetch_json(session, forecast_url, forecast_params)
+            )
             
-            weather_features = self._extract_weather_features(current_data, forecast_data)
+            weather_features = self._extract_weather_features(current_data, forecast_data, ts)
+            await self._cache_set(cache_key, weather_features, ttl)
             return weather_features
             
         except Exception as e:
-            print(f"Error fetching weather data: {e}")
-            return self._get_default_weather()
+            logger.warning("Error fetching weather data: %s", e)
+            return self._get_default_weather(ts) if fallback else None
     
-    def _extract_weather_features(self, current, forecast):
+    async def _fetch_json(self, session, url, params, retries=3, backoff=0.2):
+        """GET a URL and decode the JSON body, retrying connection failures"""
+        for attempt in range(retries + 1):
+            try:
+                async with session.get(url, params=params) as response:
+                    return orjson.loads(await response.read())
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                if attempt == retries:
+                    raise
+                await asyncio.sleep(backoff * 2 ** attempt)
+    
+    def _extract_weather_features(self, current, forecast, ts=None):
         """Extract relevant weather features for traffic prediction"""
         features = {
             'temperature': current['main']['temp'],
@@ -61,23 +250,50 @@ class DataCollector:
             'is_raining': 1 if 'rain' in current else 0,
             'is_snowing': 1 if 'snow' in current else 0,
             'rain_intensity': current.get('rain', {}).get('1h', 0),
-            'timestamp': datetime.now().timestamp()
+            'timestamp': ts if ts is not None else time.time()
         }
         
         # Add forecast features
         if 'list' in forecast:
-            forecast_temps = [item['main']['temp'] for item in forecast['list'][:4]]
-            features['temp_trend'] = np.mean(np.diff(forecast_temps))
-            features['max_temp_6h'] = max([item['main']['temp'] for item in forecast['list'][:2]])
-            features['rain_forecast_6h'] = any(['rain' in item for item in forecast['list'][:2]])
+            items = forecast['list'][:4]
+            temps = np.fromiter((item['main']['temp'] for item in items), dtype=np.float64, count=len(items))
+            rain_flags = np.fromiter(('rain' in item for item in items[:2]), dtype=bool, count=len(items[:2]))
+            temp_trend, max_temp_6h = forecast_stats(temps)
+            features['temp_trend'] = float(temp_trend)
+            features['max_temp_6h'] = float(max_temp_6h)
+            features['rain_forecast_6h'] = bool(rain_flags.any())
+        else:
+            # No forecast available, assume conditions hold
+            features['temp_trend'] = 0
+            features['max_temp_6h'] = features['temperature']
+            features['rain_forecast_6h'] = False
             
         return features
     
-    def get_traffic_data(self, origin, destination, departure_time=None):
-        """Fetch real-time traffic data from Google Maps"""
+    async def get_traffic_data(self, origin, destination, departure_time=None, now=None, *, fallback=True):
+        """Fetch real-time traffic data from Google Maps
+        
+        On failure returns no routes, or None when fallback is False.
+        """
+        ts = now.timestamp() if now is not None else time.time()
+        
+        # Point lookups (emergency context) have no route, skip the Directions round-trip
+        if tuple(origin) == tuple(destination):
+            return []
+        
+        # Only live (departure now) lookups are cached
+        cache_key = None
+        if departure_time is None:
+            ttl = self.config.TRAFFIC_CACHE_TTL
+            cache_key = (f"tr:{round(origin[0], 4)}:{round(origin[1], 4)}:"
+                         f"{round(destination[0], 4)}:{round(destination[1], 4)}:{int(ts) // ttl}")
+            cached = await self._cache_get(cache_key)
+            if cached is not None:
+                return cached
+        
         try:
             if departure_time is None:
-                departure_time = int(time.time())
+                departure_time = int(ts)
             
             url = "https://maps.googleapis.com/maps/api/directions/json"
             params = {
@@ -85,28 +301,30 @@ class DataCollector:
                 'destination': f"{destination[0]},{destination[1]}",
                 'departure_time': departure_time,
                 'traffic_model': 'best_guess',
-                'alternatives': True,
+                'alternatives': 'true',
                 'key': self.maps_api_key
             }
             
-            response = requests.get(url, params=params)
-            data = response.json()
+            session = await self._get_session()
+            data = await self._fetch_json(session, url, params)
             
             if data['status'] == 'OK':
                 routes_data = []
                 for route in data['routes']:
-                    route_info = self._extract_route_features(route)
+                    route_info = self._extract_route_features(route, ts)
                     routes_data.append(route_info)
+                if cache_key is not None:
+                    await self._cache_set(cache_key, routes_data, self.config.TRAFFIC_CACHE_TTL)
                 return routes_data
             else:
-                print(f"Traffic API Error: {data['status']}")
-                return []
+                logger.warning("Traffic API Error: %s", data['status'])
                 
         except Exception as e:
-            print(f"Error fetching traffic data: {e}")
-            return []
+            logger.warning("Error fetching traffic data: %s", e)
+        
+        return [] if fallback else None
     
-    def _extract_route_features(self, route):
+    def _extract_route_features(self, route, ts=None):
         """Extract features from Google Maps route data"""
         leg = route['legs'][0]
         
@@ -119,53 +337,73 @@ class DataCollector:
             'polyline': route['overview_polyline']['points'],
             'summary': route['summary'],
             'warnings': route.get('warnings', []),
-            'timestamp': datetime.now().timestamp()
+            'timestamp': ts if ts is not None else time.time()
         }
     
-    def get_realtime_incidents(self, bounds):
+    async def get_realtime_incidents(self, bounds, now=None):
         """Fetch traffic incidents, road closures, construction"""
-        # This would integrate with local traffic management APIs
-        # For now, return mock data structure
+        ts = now.timestamp() if now is not None else time.time()
         incidents = []
         try:
-            # Mock implementation - replace with actual traffic incident API
-            mock_incidents = [
-                {
-                    'type': 'accident',
-                    'severity': 'major',
-                    'lat': 12.9716,
-                    'lon': 77.5946,
-                    'description': 'Vehicle breakdown on outer ring road',
-                    'start_time': datetime.now().timestamp(),
-                    'estimated_duration': 45  # minutes
-                },
-                {
-                    'type': 'construction',
-                    'severity': 'moderate',
-                    'lat': 12.9344,
-                    'lon': 77.6101,
-                    'description': 'Road repair work',
-                    'start_time': datetime.now().timestamp(),
-                    'estimated_duration': 120  # minutes
-                }
-            ]
-            incidents = mock_incidents
+            incidents = await self._query_incident_store(bounds)
+            if incidents is None:
+                # Mock implementation - replace with actual traffic incident API.
+                # Every mock incident is reported whatever the bounds, point lookups included
+                incidents = [{**incident, 'start_time': ts} for incident in MOCK_INCIDENTS]
         except Exception as e:
-            print(f"Error fetching incidents: {e}")
+            logger.warning("Error fetching incidents: %s", e)
         
         return incidents
     
-    def get_contextual_data(self):
+    async def _query_incident_store(self, bounds):
+        """Incidents inside bounds from Redis, None when the store is empty or unavailable"""
+        center_lat = (bounds.north + bounds.south) / 2
+        center_lon = (bounds.east + bounds.west) / 2
+        height_km = (bounds.north - bounds.south) * 110.57
+        width_km = (bounds.east - bounds.west) * 111.32 * np.cos(np.radians(center_lat))
+        
+        if self._redis_backing_off():
+            return None
+        try:
+            redis_client = await self._get_redis()
+            # Existence check and box search share one round trip
+            async with redis_client.pipeline(transaction=False) as pipe:
+                pipe.exists(INCIDENT_GEO_KEY)
+                pipe.geosearch(INCIDENT_GEO_KEY, longitude=center_lon, latitude=center_lat,
+                               width=float(width_km), height=float(height_km), unit='km')
+                has_store, incident_ids = await pipe.execute()
+            self._redis_succeeded()
+            
+            if not has_store:
+                return None
+            if not incident_ids:
+                return []
+            
+            records = await redis_client.mget([INCIDENT_KEY_PREFIX + incident_id for incident_id in incident_ids])
+        except redis.RedisError as e:
+            self._redis_failed(e)
+            return None
+        return [msgpack.unpackb(record) for record in records if record is not None]
+    
+    def get_contextual_data(self, now=None):
         """Get contextual data like events, school schedules, etc."""
-        now = datetime.now()
+        if now is None:
+            now = datetime.now()
+        # Every feature is constant within an hour, so reuse the cached result
+        return dict(self._contextual_for(now.year, now.month, now.day, now.hour))
+    
+    def _build_contextual(self, year, month, day, hour):
+        """Compute contextual features for one hour of one day"""
+        now = datetime(year, month, day, hour)
+        weekday = now.weekday()
         
         contextual_features = {
-            'hour': now.hour,
-            'day_of_week': now.weekday(),
-            'is_weekend': 1 if now.weekday() >= 5 else 0,
-            'is_rush_hour': 1 if (7 <= now.hour <= 10) or (17 <= now.hour <= 20) else 0,
-            'is_night': 1 if (22 <= now.hour or now.hour <= 6) else 0,
-            'month': now.month,
+            'hour': hour,
+            'day_of_week': weekday,
+            'is_weekend': WEEKEND_TABLE[weekday],
+            'is_rush_hour': RUSH_HOUR_TABLE[hour],
+            'is_night': NIGHT_TABLE[hour],
+            'month': month,
             'is_holiday': self._check_holiday(now),
             'is_school_time': self._check_school_hours(now)
         }
@@ -180,13 +418,9 @@ class DataCollector:
     
     def _check_school_hours(self, date):
         """Check if it's school hours"""
-        if date.weekday() >= 5:  # Weekend
-            return 0
-        if 7 <= date.hour <= 17:  # School hours
-            return 1
-        return 0
+        return SCHOOL_HOURS_TABLE[date.weekday() * 24 + date.hour]
     
-    def _get_default_weather(self):
+    def _get_default_weather(self, ts=None):
         """Return default weather features when API fails"""
         return {
             'temperature': 25.0,
@@ -200,39 +434,117 @@ class DataCollector:
             'is_raining': 0,
             'is_snowing': 0,
             'rain_intensity': 0,
-            'timestamp': datetime.now().timestamp(),
+            'timestamp': ts if ts is not None else time.time(),
             'temp_trend': 0,
             'max_temp_6h': 25.0,
             'rain_forecast_6h': False
         }
     
-    def collect_all_data(self, origin, destination):
-        """Collect all data needed for traffic prediction"""
-        # Get weather data for origin
-        weather_data = self.get_weather_data(origin[0], origin[1])
+    async def collect_all_data(self, origin, destination, include_forecast=False):
+        """Collect all data needed for traffic prediction, memoised per grid cell"""
+        key = (round(origin[0], 3), round(origin[1], 3),
+               round(destination[0], 3), round(destination[1], 3), include_forecast)
         
-        # Get traffic data
-        traffic_data = self.get_traffic_data(origin, destination)
+        with self._collect_cache_lock:
+            cached = self._collect_cache.get(key)
+        if cached is not None:
+            return cached
+        
+        # Concurrent misses for the same cell wait for a single collection
+        lock_key = (asyncio.get_running_loop(), key)
+        lock = self._collect_locks.setdefault(lock_key, asyncio.Lock())
+        try:
+            async with lock:
+                with self._collect_cache_lock:
+                    cached = self._collect_cache.get(key)
+                if cached is None:
+                    cached, degraded = await self._collect_all_data(origin, destination, include_forecast)
+                    # Results with fallback data are not memoised, the next caller retries upstream
+                    if not degraded:
+                        with self._collect_cache_lock:
+                            self._collect_cache[key] = cached
+        finally:
+            if not lock.locked():
+                self._collect_locks.pop(lock_key, None)
+        
+        return cached
+    
+    async def _collect_all_data(self, origin, destination, include_forecast):
+        """Collect weather, traffic, contextual and incident data, and whether any part fell back to defaults"""
+        # One clock read shared by every part of the result
+        now = datetime.now()
         
         # Get contextual data
-        contextual_data = self.get_contextual_data()
-        
-        # Get incidents
-        bounds = {
-            'north': max(origin[0], destination[0]) + 0.01,
-            'south': min(origin[0], destination[0]) - 0.01,
-            'east': max(origin[1], destination[1]) + 0.01,
-            'west': min(origin[1], destination[1]) - 0.01
-        }
-        incidents = self.get_realtime_incidents(bounds)
+        contextual_data = self.get_contextual_data(now)
+        
+        # Incident search area
+        bounds = Bounds(*route_bounds(
+            float(origin[0]), float(origin[1]), float(destination[0]), float(destination[1]), 0.01
+        ))
+        
+        # Weather, traffic and incidents are independent I/O, fetch them concurrently
+        weather_data, traffic_data, incidents = await asyncio.gather(
+            self.get_weather_data(origin[0], origin[1], now, include_forecast=include_forecast, fallback=False),
+            self.get_traffic_data(origin, destination, now=now, fallback=False),
+            self.get_realtime_incidents(bounds, now)
+        )
+        
+        degraded = weather_data is None or traffic_data is None
+        if weather_data is None:
+            weather_data = self._get_default_weather(now.timestamp())
+        if traffic_data is None:
+            traffic_data = []
         
         return {
             'weather': weather_data,
             'traffic': traffic_data,
             'contextual': contextual_data,
             'incidents': incidents,
-            'timestamp': datetime.now().timestamp()
-        }
+            'timestamp': now.timestamp()
+        }, degraded
+    
+    def _get_sync_loop(self):
+        """Return the background event loop for sync callers, starting it on first use"""
+        with self._sync_loop_lock:
+            if self._sync_loop is None or self._sync_loop_pid != os.getpid():
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=self._serve_loop, args=(loop,), name='data-collector-loop',
+                                 daemon=True).start()
+                self._sync_loop = loop
+                self._sync_loop_pid = os.getpid()
+            return self._sync_loop
+    
+    @staticmethod
+    def _serve_loop(loop):
+        try:
+            loop.run_forever()
+        finally:
+            loop.close()
+    
+    def _run_sync(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self._get_sync_loop()).result()
+    
+    def close_sync(self):
+        """Close the background loop's clients and stop the loop"""
+        with self._sync_loop_lock:
+            loop = self._sync_loop if self._sync_loop_pid == os.getpid() else None
+            self._sync_loop = self._sync_loop_pid = None
+        if loop is not None:
+            asyncio.run_coroutine_threadsafe(self.close(), loop).result()
+            loop.call_soon_threadsafe(loop.stop)
+    
+    def collect_all_data_sync(self, origin, destination, include_forecast=False):
+        """Blocking wrapper around collect_all_data for non-async callers"""
+        return self._run_sync(self.collect_all_data(origin, destination, include_forecast))
+    
+    def collect_many_sync(self, pairs):
+        """Collect data for several (origin, destination) pairs concurrently"""
+        async def _collect():
+            return await asyncio.gather(*(
+                self.collect_all_data(origin, destination) for origin, destination in pairs
+            ))
+        
+        return self._run_sync(_collect())
 
 # Example usage and data generation for training
 if __name__ == "__main__":
@@ -242,5 +554,6 @@ if __name__ == "__main__":
     origin = (12.9716, 77.5946)  # UB City Mall
     destination = (12.9698, 77.7500)  # Whitefield
     
-    data = collector.collect_all_data(origin, destination)
+    data = collector.collect_all_data_sync(origin, destination)
+    collector.close_sync()
     print("Sample collected data:", json.dumps(data, indent=2, default=str))
\ No newline at end of file
@@ -1,270 +1,324 @@
 import pandas as pd
 import numpy as np
-from sklearn.preprocessing import StandardScaler, LabelEncoder
-from sklearn.model_selection import train_test_split
+from sklearn.preprocessing import LabelEncoder
 import joblib
+import hashlib
+import inspect
+import os
 from datetime import datetime
 import warnings
+import numba
+import numba_kernels
+from numba_kernels import (
+    SAMPLE_COLUMNS, generate_samples,
+    SIN_HOUR, COS_HOUR, SIN_DAY, COS_DAY, SIN_MONTH, COS_MONTH
+)
 warnings.filterwarnings('ignore')
 
+# Model input columns, in order
+FEATURE_COLUMNS = [
+    'hour', 'day_of_week', 'month',
+    'temperature', 'humidity', 'pressure', 'visibility', 'wind_speed',
+    'is_raining', 'is_snowing', 'rain_intensity', 'temp_trend', 'rain_forecast_6h',
+    'is_weekend', 'is_rush_hour', 'is_night', 'is_holiday', 'is_school_time',
+    'distance_km', 'duration_normal_min', 'historical_traffic_ratio',
+    'num_accidents', 'num_construction', 'major_incident_nearby',
+    'sin_hour', 'cos_hour', 'sin_day', 'cos_day', 'sin_month', 'cos_month'
+]
+FEATURE_INDEX = {col: i for i, col in enumerate(FEATURE_COLUMNS)}
+
+# Continuous columns standardised by the numerical scaler, in scaler order
+NUMERICAL_FEATURES = [
+    'temperature', 'humidity', 'pressure', 'visibility', 'wind_speed',
+    'rain_intensity', 'temp_trend', 'distance_km', 'duration_normal_min'
+]
+
+# Synthetic sample columns holding small integer values, stored as int8
+INTEGER_COLUMNS = [
+    'hour', 'day_of_week', 'month',
+    'is_raining', 'is_snowing', 'rain_forecast_6h',
+    'is_weekend', 'is_rush_hour', 'is_night', 'is_holiday', 'is_school_time',
+    'num_accidents', 'num_construction', 'major_incident_nearby'
+]
+SAMPLE_DTYPES = {col: np.int8 if col in INTEGER_COLUMNS else np.float32 for col in SAMPLE_COLUMNS}
+
+def _sample_kernel_hash():
+    """Fingerprint of everything generate_samples output depends on: its source, columns, block size and tables"""
+    digest = hashlib.sha256(inspect.getsource(generate_samples.py_func).encode())
+    digest.update(repr((SAMPLE_COLUMNS, numba_kernels.SAMPLE_BLOCK)).encode())
+    for table in (SIN_HOUR, COS_HOUR, SIN_DAY, COS_DAY, SIN_MONTH, COS_MONTH):
+        digest.update(table.tobytes())
+    return digest.hexdigest()[:12]
+
+# Part of the synthetic cache file name and of the trained model manifest
+SAMPLE_KERNEL_HASH = _sample_kernel_hash()
+
+class FastScaler:
+    """Standardises columns to zero mean and unit variance, same attributes as sklearn's StandardScaler"""
+    __slots__ = ('mean_', 'scale_')
+    
+    def fit(self, A):
+        self.mean_ = A.mean(axis=0, dtype=np.float64)
+        scale = A.std(axis=0, dtype=np.float64)
+        scale[scale == 0] = 1.0
+        self.scale_ = scale
+        return self
+    
+    def transform(self, A, copy=True):
+        if copy:
+            return ((A - self.mean_) / self.scale_).astype(A.dtype, copy=False)
+        
+        # Scale in place in A's own dtype, no temporaries
+        A -= self.mean_.astype(A.dtype)
+        A /= self.scale_.astype(A.dtype)
+        return A
+    
+    def fit_transform(self, A):
+        return self.fit(A).transform(A)
+
 class DataPreprocessor:
     def __init__(self):
         self.scalers = {}
         self.encoders = {}
         self.feature_columns = []
+        self._sample_layout = None
         
     def create_training_features(self, data_dict):
-        """Convert collected data dictionary to feature vector"""
-        features = {}
+        """Convert collected data dictionary to a feature dict keyed by FEATURE_COLUMNS"""
+        return dict(zip(FEATURE_COLUMNS, self.create_feature_vector(data_dict).tolist()))
+    
+    def create_feature_vector(self, data_dict, out=None):
+        """Write the features of one collected sample into a float32 vector laid out as FEATURE_COLUMNS"""
+        if out is None:
+            out = np.zeros(len(FEATURE_COLUMNS), dtype=np.float32)
+        else:
+            out.fill(0)
+        idx = FEATURE_INDEX
         
         # Weather features
         if 'weather' in data_dict:
             weather = data_dict['weather']
-            features.update({
-                'temperature': weather['temperature'],
-                'humidity': weather['humidity'],
-                'pressure': weather['pressure'],
-                'visibility': weather['visibility'],
-                'wind_speed': weather['wind_speed'],
-                'is_raining': weather['is_raining'],
-                'is_snowing': weather['is_snowing'],
-                'rain_intensity': weather['rain_intensity'],
-                'temp_trend': weather.get('temp_trend', 0),
-                'rain_forecast_6h': int(weather.get('rain_forecast_6h', False))
-            })
+            out[idx['temperature']] = weather['temperature']
+            out[idx['humidity']] = weather['humidity']
+            out[idx['pressure']] = weather['pressure']
+            out[idx['visibility']] = weather['visibility']
+            out[idx['wind_speed']] = weather['wind_speed']
+            out[idx['is_raining']] = weather['is_raining']
+            out[idx['is_snowing']] = weather['is_snowing']
+            out[idx['rain_intensity']] = weather['rain_intensity']
+            out[idx['temp_trend']] = weather.get('temp_trend', 0)
+            out[idx['rain_forecast_6h']] = int(weather.get('rain_forecast_6h', False))
         
         # Contextual features
+        hour, day_of_week, month = 0, 0, 1
         if 'contextual' in data_dict:
             contextual = data_dict['contextual']
-            features.update({
-                'hour': contextual['hour'],
-                'day_of_week': contextual['day_of_week'],
-                'is_weekend': contextual['is_weekend'],
-                'is_rush_hour': contextual['is_rush_hour'],
-                'is_night': contextual['is_night'],
-                'month': contextual['month'],
-                'is_holiday': contextual['is_holiday'],
-                'is_school_time': contextual['is_school_time']
-            })
+            hour = contextual['hour']
+            day_of_week = contextual['day_of_week']
+            month = contextual['month']
+            out[idx['hour']] = hour
+            out[idx['day_of_week']] = day_of_week
+            out[idx['month']] = month
+            out[idx['is_weekend']] = contextual['is_weekend']
+            out[idx['is_rush_hour']] = contextual['is_rush_hour']
+            out[idx['is_night']] = contextual['is_night']
+            out[idx['is_holiday']] = contextual['is_holiday']
+            out[idx['is_school_time']] = contextual['is_school_time']
         
         # Traffic features (from historical data or current conditions)
         if 'traffic' in data_dict and data_dict['traffic']:
             traffic = data_dict['traffic'][0]  # Take first route
-            features.update({
-                'distance_km': traffic['distance_km'],
-                'duration_normal_min': traffic['duration_normal_min'],
-                'historical_traffic_ratio': traffic.get('traffic_ratio', 1.0)
-            })
+            out[idx['distance_km']] = traffic['distance_km']
+            out[idx['duration_normal_min']] = traffic['duration_normal_min']
+            out[idx['historical_traffic_ratio']] = traffic.get('traffic_ratio', 1.0)
         
         # Incident features
         if 'incidents' in data_dict:
-            incidents = data_dict['incidents']
-            features.update({
-                'num_accidents': len([i for i in incidents if i['type'] == 'accident']),
-                'num_construction': len([i for i in incidents if i['type'] == 'construction']),
-                'major_incident_nearby': int(any([i['severity'] == 'major' for i in incidents]))
-            })
+            num_accidents = num_construction = 0
+            major_incident = False
+            for incident in data_dict['incidents']:
+                incident_type = incident['type']
+                num_accidents += incident_type == 'accident'
+                num_construction += incident_type == 'construction'
+                major_incident |= incident['severity'] == 'major'
+            
+            out[idx['num_accidents']] = num_accidents
+            out[idx['num_construction']] = num_construction
+            out[idx['major_incident_nearby']] = major_incident
         
-        # Time-based features
-        features.update({
-            'sin_hour': np.sin(2 * np.pi * features.get('hour', 0) / 24),
-            'cos_hour': np.cos(2 * np.pi * features.get('hour', 0) / 24),
-            'sin_day': np.sin(2 * np.pi * features.get('day_of_week', 0) / 7),
-            'cos_day': np.cos(2 * np.pi * features.get('day_of_week', 0) / 7),
-            'sin_month': np.sin(2 * np.pi * features.get('month', 1) / 12),
-            'cos_month': np.cos(2 * np.pi * features.get('month', 1) / 12)
-        })
+        # Time-based features from precomputed tables
+        out[idx['sin_hour']] = SIN_HOUR[hour]
+        out[idx['cos_hour']] = COS_HOUR[hour]
+        out[idx['sin_day']] = SIN_DAY[day_of_week]
+        out[idx['cos_day']] = COS_DAY[day_of_week]
+        out[idx['sin_month']] = SIN_MONTH[month]
+        out[idx['cos_month']] = COS_MONTH[month]
         
-        return features
+        return out
     
-    def generate_synthetic_training_data(self, n_samples=10000):
-        """Generate synthetic training data for initial model training"""
-        np.random.seed(42)
+    def generate_synthetic_training_data(self, n_samples=10000, seed=42, cache_dir='data/synthetic', n_jobs=None):
+        """Generate synthetic training data for initial model training, cached on disk per
+        (n_samples, seed, kernel source)
         
-        data = []
-        for i in range(n_samples):
-            # Random time
-            hour = np.random.randint(0, 24)
-            day_of_week = np.random.randint(0, 7)
-            month = np.random.randint(1, 13)
-            
-            # Weather conditions
-            temperature = np.random.normal(25, 8)  # Celsius
-            humidity = np.random.uniform(40, 90)
-            is_raining = np.random.choice([0, 1], p=[0.8, 0.2])
-            rain_intensity = np.random.exponential(2) if is_raining else 0
-            visibility = np.random.uniform(5, 10) if is_raining else 10
-            wind_speed = np.random.exponential(3)
-            
-            # Contextual features
-            is_weekend = 1 if day_of_week >= 5 else 0
-            is_rush_hour = 1 if (7 <= hour <= 10) or (17 <= hour <= 20) else 0
-            is_night = 1 if (22 <= hour or hour <= 6) else 0
-            is_holiday = np.random.choice([0, 1], p=[0.95, 0.05])
-            is_school_time = 1 if (not is_weekend and 7 <= hour <= 17 and not is_holiday) else 0
-            
-            # Route features
-            distance_km = np.random.uniform(2, 25)
-            base_duration = distance_km * np.random.uniform(2, 4)  # 2-4 min per km base
-            
-            # Incidents
-            num_accidents = np.random.poisson(0.1)
-            num_construction = np.random.poisson(0.05)
-            major_incident_nearby = 1 if (num_accidents > 0 and np.random.random() < 0.3) else 0
-            
-            # Calculate traffic multiplier based on conditions
-            traffic_multiplier = 1.0
-            
-            # Time-based effects
-            if is_rush_hour:
-                traffic_multiplier *= np.random.uniform(1.5, 2.5)
-            elif is_night:
-                traffic_multiplier *= np.random.uniform(0.7, 0.9)
-            
-            # Weather effects
-            if is_raining:
-                traffic_multiplier *= np.random.uniform(1.2, 1.8)
-                if rain_intensity > 5:
-                    traffic_multiplier *= np.random.uniform(1.3, 2.0)
-            
-            # Weekend effects
-            if is_weekend and not is_rush_hour:
-                traffic_multiplier *= np.random.uniform(0.8, 1.1)
-            
-            # Holiday effects
-            if is_holiday:
-                traffic_multiplier *= np.random.uniform(0.6, 0.9)
-            
-            # Incident effects
-            if major_incident_nearby:
-                traffic_multiplier *= np.random.uniform(1.5, 2.5)
-            elif num_accidents > 0:
-                traffic_multiplier *= np.random.uniform(1.2, 1.6)
-            if num_construction > 0:
-                traffic_multiplier *= np.random.uniform(1.1, 1.4)
-            
-            # Add noise
-            traffic_multiplier *= np.random.uniform(0.9, 1.1)
-            
-            # Calculate final duration
-            duration_with_traffic = base_duration * traffic_multiplier
-            
-            # Create feature vector
-            sample = {
-                'hour': hour,
-                'day_of_week': day_of_week,
-                'month': month,
-                'temperature': temperature,
-                'humidity': humidity,
-                'pressure': np.random.normal(1013, 10),
-                'visibility': visibility,
-                'wind_speed': wind_speed,
-                'is_raining': is_raining,
-                'is_snowing': 0,  # Rare in most Indian cities
-                'rain_intensity': rain_intensity,
-                'temp_trend': np.random.normal(0, 1),
-                'rain_forecast_6h': int(is_raining or np.random.random() < 0.1),
-                'is_weekend': is_weekend,
-                'is_rush_hour': is_rush_hour,
-                'is_night': is_night,
-                'is_holiday': is_holiday,
-                'is_school_time': is_school_time,
-                'distance_km': distance_km,
-                'duration_normal_min': base_duration,
-                'historical_traffic_ratio': traffic_multiplier,
-                'num_accidents': num_accidents,
-                'num_construction': num_construction,
-                'major_incident_nearby': major_incident_nearby,
-                'sin_hour': np.sin(2 * np.pi * hour / 24),
-                'cos_hour': np.cos(2 * np.pi * hour / 24),
-                'sin_day': np.sin(2 * np.pi * day_of_week / 7),
-                'cos_day': np.cos(2 * np.pi * day_of_week / 7),
-                'sin_month': np.sin(2 * np.pi * month / 12),
-                'cos_month': np.cos(2 * np.pi * month / 12),
-                # Target variables
-                'traffic_multiplier': traffic_multiplier,
-                'duration_with_traffic': duration_with_traffic,
-                'delay_minutes': duration_with_traffic - base_duration
-            }
+        n_jobs caps the kernel's worker threads (-1 for all cores); the output does not depend on it.
+        """
+        path = os.path.join(cache_dir, f"synth_{n_samples}_{seed}_{SAMPLE_KERNEL_HASH}.npz") if cache_dir else None
+        
+        out = None
+        if path and os.path.exists(path):
+            with np.load(path) as cached:
+                if tuple(cached['columns'].tolist()) == SAMPLE_COLUMNS:
+                    out = cached['samples']
+        
+        if out is None:
+            out = np.empty((n_samples, len(SAMPLE_COLUMNS)), dtype=np.float32)
+            if n_jobs is None:
+                generate_samples(out, n_samples, seed)
+            else:
+                # Thread count is per calling thread, restore it for other kernels
+                previous = numba.get_num_threads()
+                max_threads = numba.config.NUMBA_NUM_THREADS
+                numba.set_num_threads(max_threads if n_jobs == -1 else max(1, min(n_jobs, max_threads)))
+                try:
+                    generate_samples(out, n_samples, seed)
+                finally:
+                    numba.set_num_threads(previous)
             
-            data.append(sample)
+            if path:
+                os.makedirs(cache_dir, exist_ok=True)
+                tmp_path = f"{path[:-4]}.{os.getpid()}.tmp.npz"
+                np.savez(tmp_path, samples=out, columns=np.array(SAMPLE_COLUMNS, dtype=str))
+                os.replace(tmp_path, path)
         
-        return pd.DataFrame(data)
+        # Each column takes its final dtype straight from the buffer, no frame-wide astype pass
+        return pd.DataFrame({
+            col: out[:, j].astype(SAMPLE_DTYPES[col], copy=False)
+            for j, col in enumerate(SAMPLE_COLUMNS)
+        }, copy=False)
     
     def prepare_features(self, df, target_column='traffic_multiplier', fit_scalers=True):
-        """Prepare features for training"""
-        # Define feature columns
-        feature_columns = [
-            'hour', 'day_of_week', 'month',
-            'temperature', 'humidity', 'pressure', 'visibility', 'wind_speed',
-            'is_raining', 'is_snowing', 'rain_intensity', 'temp_trend', 'rain_forecast_6h',
-            'is_weekend', 'is_rush_hour', 'is_night', 'is_holiday', 'is_school_time',
-            'distance_km', 'duration_normal_min', 'historical_traffic_ratio',
-            'num_accidents', 'num_construction', 'major_incident_nearby',
-            'sin_hour', 'cos_hour', 'sin_day', 'cos_day', 'sin_month', 'cos_month'
-        ]
-        
+        """Prepare features for training as a float32 frame with columns self.feature_columns"""
         # Filter available columns
-        available_columns = [col for col in feature_columns if col in df.columns]
+        available_columns = [col for col in FEATURE_COLUMNS if col in df.columns]
         self.feature_columns = available_columns
+        self._sample_layout = None
         
-        X = df[available_columns].copy()
+        values = np.ascontiguousarray(df[available_columns].to_numpy(dtype=np.float32, copy=True))
         
-        # Handle missing values
-        X = X.fillna(X.mean())
+        # Handle missing values, column means only computed when something is missing
+        nan_mask = np.isnan(values)
+        if nan_mask.any():
+            col_mean = np.nanmean(values, axis=0)
+            rows, cols = np.nonzero(nan_mask)
+            values[rows, cols] = col_mean[cols]
         
-        # Scale numerical features
-        numerical_features = [
-            'temperature', 'humidity', 'pressure', 'visibility', 'wind_speed',
-            'rain_intensity', 'temp_trend', 'distance_km', 'duration_normal_min'
-        ]
-        
-        numerical_features = [col for col in numerical_features if col in X.columns]
+        # Scale numerical features on the array
+        num_idx = [available_columns.index(col) for col in NUMERICAL_FEATURES if col in available_columns]
         
+        # Only the numerical block is copied out, scaled in place and written back
+        numerical = values[:, num_idx]
         if fit_scalers:
-            self.scalers['numerical'] = StandardScaler()
-            X[numerical_features] = self.scalers['numerical'].fit_transform(X[numerical_features])
-        elif 'numerical' in self.scalers:
-            X[numerical_features] = self.scalers['numerical'].transform(X[numerical_features])
+            self.scalers['numerical'] = FastScaler().fit(numerical)
+        if 'numerical' in self.scalers and num_idx:
+            values[:, num_idx] = self.scalers['numerical'].transform(numerical, copy=False)
         
+        # Same feature names as preprocess_single_sample, wrapped without copying the block
+        X = pd.DataFrame(values, columns=available_columns, copy=False)
         if target_column in df.columns:
-            y = df[target_column].values
+            y = df[target_column].to_numpy()
             return X, y
         
         return X
     
     def split_data(self, X, y, test_size=0.2):
-        """Split data into train/test sets"""
-        return train_test_split(X, y, test_size=test_size, random_state=42, stratify=None)
+        """Split data into train/test sets with one seeded shuffle, frames keep their columns"""
+        y = np.asarray(y)
+        n_samples = len(y)
+        
+        idx = np.random.default_rng(42).permutation(n_samples)
+        n_train = n_samples - int(np.ceil(n_samples * test_size))
+        train_idx, test_idx = idx[:n_train], idx[n_train:]
+        
+        if isinstance(X, pd.DataFrame):
+            X_train, X_test = X.iloc[train_idx], X.iloc[test_idx]
+        else:
+            X = np.asarray(X)
+            X_train, X_test = X[train_idx], X[test_idx]
+        
+        return X_train, X_test, y[train_idx], y[test_idx]
     
     def save_preprocessors(self, filepath_base):
-        """Save scalers and encoders"""
-        joblib.dump(self.scalers, f"{filepath_base}_scalers.pkl")
-        joblib.dump(self.encoders, f"{filepath_base}_encoders.pkl")
-        joblib.dump(self.feature_columns, f"{filepath_base}_features.pkl")
+        """Save scaler state and feature columns to a single .npz"""
+        state = {'features': np.array(self.feature_columns, dtype=str)}
+        if 'numerical' in self.scalers:
+            state['mean'] = np.asarray(self.scalers['numerical'].mean_)
+            state['scale'] = np.asarray(self.scalers['numerical'].scale_)
+        np.savez_compressed(f"{filepath_base}.npz", **state)
+        
+        # Encoders are not array state, only written when in use
+        if self.encoders:
+            joblib.dump(self.encoders, f"{filepath_base}_encoders.pkl")
     
     def load_preprocessors(self, filepath_base):
-        """Load scalers and encoders"""
+        """Load scaler state and feature columns"""
+        if not os.path.exists(f"{filepath_base}.npz"):
+            return self._load_legacy_preprocessors(filepath_base)
+        
+        with np.load(f"{filepath_base}.npz") as state:
+            self.feature_columns = state['features'].tolist()
+            self.scalers = {}
+            if 'mean' in state:
+                scaler = FastScaler()
+                scaler.mean_ = state['mean']
+                scaler.scale_ = state['scale']
+                self.scalers['numerical'] = scaler
+        
+        encoders_path = f"{filepath_base}_encoders.pkl"
+        self.encoders = joblib.load(encoders_path) if os.path.exists(encoders_path) else {}
+        self._sample_layout = None
+    
+    def _load_legacy_preprocessors(self, filepath_base):
+        """Load preprocessors saved as separate pickle files"""
         self.scalers = joblib.load(f"{filepath_base}_scalers.pkl")
         self.encoders = joblib.load(f"{filepath_base}_encoders.pkl")
         self.feature_columns = joblib.load(f"{filepath_base}_features.pkl")
+        self._sample_layout = None
+    
+    def _get_sample_layout(self):
+        """Column positions and scaler parameters used by preprocess_single_sample"""
+        if self._sample_layout is None:
+            columns = self.feature_columns or FEATURE_COLUMNS
+            col_index = {col: i for i, col in enumerate(columns)}
+            
+            # Positions in the full feature vector, None when the layouts already match
+            gather_idx = None
+            if list(columns) != FEATURE_COLUMNS:
+                gather_idx = np.array([FEATURE_INDEX[col] for col in columns], dtype=np.intp)
+            
+            num_idx = np.array([col_index[col] for col in NUMERICAL_FEATURES if col in col_index], dtype=np.intp)
+            
+            mean = scale = None
+            if 'numerical' in self.scalers:
+                mean = self.scalers['numerical'].mean_.astype(np.float32)
+                scale = self.scalers['numerical'].scale_.astype(np.float32)
+            
+            self._sample_layout = (columns, gather_idx, num_idx, mean, scale)
+        return self._sample_layout
     
     def preprocess_single_sample(self, data_dict):
         """Preprocess a single sample for prediction"""
-        features = self.create_training_features(data_dict)
+        columns, gather_idx, num_idx, mean, scale = self._get_sample_layout()
         
-        # Create dataframe with single row
-        df = pd.DataFrame([features])
+        # Fixed-layout row, features missing from the sample stay 0
+        vector = self.create_feature_vector(data_dict)
+        x = (vector if gather_idx is None else vector[gather_idx])[np.newaxis, :]
         
-        # Add missing columns with default values
-        for col in self.feature_columns:
-            if col not in df.columns:
-                df[col] = 0
+        # Apply the fitted scaler directly
+        if mean is not None:
+            x[0, num_idx] = (x[0, num_idx] - mean) / scale
         
-        # Prepare features (without fitting scalers)
-        X = self.prepare_features(df, target_column=None, fit_scalers=False)
-        
-        return X
+        # Predictors address features by column name
+        return pd.DataFrame(x, columns=columns, copy=False)
 
 # Example usage
 if __name__ == "__main__":
@@ -6,13 +6,80 @@ from models.traffic_predictor import EmergencyTrafficPredictor
 from models.route_optimizer import RouteOptimizer
 from data.data_collector import DataCollector
 from data.data_preprocessor import DataPreprocessor
-from utils.map_utils import MapUtils
 from utils.distance_calculator import DistanceCalculator
-import json
 import time
+import heapq
+import logging
+import threading
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
 import numpy as np
 import pandas as pd
+import redis
+from cachetools import TTLCache
+from config import Config
+from numba_kernels import haversine_within
+from model_manifest import manifest_valid, write_manifest
+from api.logging_setup import configure_logging, configure_worker_logging, shutdown_logging
+
+logger = logging.getLogger(__name__)
+
+# Redis GEO set holding hospital locations
+HOSPITAL_GEO_KEY = 'hospitals'
+
+# City bounds as (low, high) ranges for sampling test locations
+CITY_LAT_RANGE = (Config.CITY_BOUNDS['south'], Config.CITY_BOUNDS['north'])
+CITY_LON_RANGE = (Config.CITY_BOUNDS['west'], Config.CITY_BOUNDS['east'])
+
+# One bit per hospital specialty, and the specialties that can treat each patient condition
+SPECIALTY_BITS = {
+    specialty: 1 << bit for bit, specialty in enumerate([
+        'cardiology', 'cardiac surgery', 'neurology', 'neurosurgery', 'trauma', 'surgery',
+        'emergency medicine', 'general medicine', 'pediatrics', 'oncology'
+    ])
+}
+CONDITION_SPECIALTIES = {
+    'cardiac': ['cardiology', 'cardiac surgery'],
+    'stroke': ['neurology', 'neurosurgery'],
+    'trauma': ['trauma', 'surgery'],
+    'respiratory': ['emergency medicine', 'general medicine']
+}
+
+def specialty_mask(specialties):
+    """Bitmask of the known specialties in a list, unknown names are ignored"""
+    mask = 0
+    for specialty in specialties:
+        mask |= SPECIALTY_BITS.get(specialty, 0)
+    return mask
+
+CONDITION_SPECIALTY_MASK = {
+    condition: specialty_mask(specialties) for condition, specialties in CONDITION_SPECIALTIES.items()
+}
+
+EARTH_RADIUS_KM = 6371.0
+
+# Hospital count from which nearest-hospital search uses a BallTree instead of a linear scan
+HOSPITAL_TREE_MIN = 64
+
+def approx_km(lat1, lon1, lat2, lon2):
+    """Equirectangular distance between points given in radians, within 0.1% of haversine at city scale"""
+    dx = (lon2 - lon1) * np.cos((lat1 + lat2) / 2)
+    dy = lat2 - lat1
+    return EARTH_RADIUS_KM * np.sqrt(dx * dx + dy * dy)
+
+# Service owned by a simulation worker process, built once by its initializer
+_worker_service = None
+
+def _init_simulation_worker():
+    global _worker_service
+    configure_worker_logging(Config.LOG_LEVEL)
+    _worker_service = EmergencyResponseService()
+
+def _simulate_emergency(emergency):
+    """Handle one simulated call inside a worker, returning the response and its processing time"""
+    start_time = time.time()
+    response = _worker_service.handle_emergency_call(emergency)
+    return response, time.time() - start_time
 
 class EmergencyResponseService:
     """Main service class coordinating all emergency response optimization"""
@@ -22,53 +89,73 @@ class EmergencyResponseService:
         self.preprocessor = DataPreprocessor()
         self.traffic_predictor = EmergencyTrafficPredictor()
         self.route_optimizer = RouteOptimizer(self.traffic_predictor)
-        self.map_utils = MapUtils()
+        self._map_utils = None
         self.distance_calc = DistanceCalculator()
         
+        # Route options per (emergency cell, hospital, traffic conditions)
+        self._route_cache = TTLCache(maxsize=Config.ROUTE_CACHE_SIZE, ttl=Config.ROUTE_CACHE_TTL)
+        self._route_cache_lock = threading.Lock()
+        
+        # Random source for simulated calls
+        self._rng = np.random.default_rng()
+        
         # Initialize models and data
         self._initialize_system()
     
+    @property
+    def map_utils(self):
+        """Map helpers, imported on first use since they pull in the mapping stack"""
+        if self._map_utils is None:
+            from utils.map_utils import MapUtils
+            self._map_utils = MapUtils()
+        return self._map_utils
+    
     def _initialize_system(self):
         """Initialize the emergency response system"""
-        print("Initializing Emergency Response System...")
+        logger.info("Initializing Emergency Response System...")
         
-        try:
-            # Load trained models
-            self.traffic_predictor.load_models("models/trained_models/traffic_model")
-            self.preprocessor.load_preprocessors("models/trained_models/preprocessor")
-            print("✓ ML models loaded successfully")
-        except:
-            print("⚠ Training new models (first run)...")
+        if not manifest_valid():
+            # Missing models, or trained on feature definitions that have since changed
+            logger.warning("⚠ Training new models (no up-to-date models found)...")
             self._train_initial_models()
+        else:
+            try:
+                # Load trained models
+                self.traffic_predictor.load_models("models/trained_models/traffic_model")
+                self.preprocessor.load_preprocessors("models/trained_models/preprocessor")
+                logger.info("✓ ML models loaded successfully")
+            except:
+                logger.warning("⚠ Training new models (first run)...")
+                self._train_initial_models()
         
         # Initialize road network
-        from config import Config
         self.route_optimizer.initialize_road_network(Config.CITY_BOUNDS)
-        print("✓ Road network initialized")
+        logger.info("✓ Road network initialized")
         
         # Load hospital data
         self._load_hospital_database()
-        print("✓ Hospital database loaded")
+        logger.info("✓ Hospital database loaded")
         
-        print("🚨 Emergency Response System Ready!")
+        logger.info("🚨 Emergency Response System Ready!")
     
     def _train_initial_models(self):
         """Train initial models with synthetic data"""
-        print("Generating synthetic training data...")
+        logger.info("Generating synthetic training data...")
         df = self.preprocessor.generate_synthetic_training_data(n_samples=10000)
         
-        print("Preparing features...")
+        logger.info("Preparing features...")
         X, y = self.preprocessor.prepare_features(df, target_column='traffic_multiplier')
         X_train, X_test, y_train, y_test = self.preprocessor.split_data(X, y)
         
-        print("Training models...")
+        logger.info("Training models...")
         self.traffic_predictor.train_models(X_train, y_train, X_test, y_test)
         
         # Save models
         self.traffic_predictor.save_models("models/trained_models/traffic_model")
         self.preprocessor.save_preprocessors("models/trained_models/preprocessor")
+        write_manifest()
         
-        print("✓ Models trained and saved")
+        logger.info("✓ Models trained and saved")
     
     def _load_hospital_database(self):
         """Load hospital database"""
@@ -107,32 +194,153 @@ class EmergencyResponseService:
         ]
         
         self.route_optimizer.load_hospital_data(hospitals)
+        
+        # Bed availability estimate per hospital, fixed until real-time feeds exist
+        self.hospital_beds_available = {
+            hospital['id']: hospital['capacity'] - int(hospital['capacity'] * 0.7)
+            for hospital in hospitals
+        }
+        
+        self.hospitals_by_id = {hospital['id']: hospital for hospital in hospitals}
+        
+        # Column arrays for vectorised distance scoring, in self._hosp_ids order
+        self._hosp_ids = [hospital['id'] for hospital in hospitals]
+        self._hosp_pos = {hospital_id: i for i, hospital_id in enumerate(self._hosp_ids)}
+        self._hosp_lat = np.radians([hospital['lat'] for hospital in hospitals])
+        self._hosp_lon = np.radians([hospital['lon'] for hospital in hospitals])
+        self._hosp_cos_lat = np.cos(self._hosp_lat)
+        self._hosp_spec_mask = np.array(
+            [specialty_mask(hospital['specialties']) for hospital in hospitals], dtype=np.int64
+        )
+        self._hosp_tree = None
+        if len(hospitals) >= HOSPITAL_TREE_MIN:
+            # Imported only for hospital sets large enough to need it
+            from sklearn.neighbors import BallTree
+            self._hosp_tree = BallTree(np.column_stack([self._hosp_lat, self._hosp_lon]), metric='haversine')
+        
+        self._index_hospital_locations(hospitals)
     
-    def handle_emergency_call(self, emergency_data):
-        """Handle new emergency call and provide optimal response"""
+    def _index_hospital_locations(self, hospitals):
+        """Rebuild the Redis GEO set used for nearest-hospital queries"""
         try:
-            print(f"\n🚨 Emergency Call Received: {emergency_data.get('call_id', 'Unknown')}")
+            self.geo_index = redis.Redis.from_url(Config.REDIS_URL, decode_responses=True)
+            members = []
+            for hospital in hospitals:
+                members.extend([hospital['lon'], hospital['lat'], hospital['id']])
+            
+            pipe = self.geo_index.pipeline()
+            pipe.delete(HOSPITAL_GEO_KEY)
+            pipe.geoadd(HOSPITAL_GEO_KEY, members)
+            pipe.execute()
+        except redis.RedisError as e:
+            logger.warning("⚠ Hospital geo index unavailable, using in-process search: %s", e)
+            self.geo_index = None
+    
+    def find_nearby_hospitals(self, latitude, longitude, radius_km=10, count=5, condition=None):
+        """Nearest hospitals within radius_km, closest first
+        
+        With a known patient condition only hospitals with a matching specialty are returned.
+        """
+        required_mask = CONDITION_SPECIALTY_MASK.get(condition, 0)
+        
+        if self.geo_index is not None:
+            try:
+                matches = self.geo_index.geosearch(
+                    HOSPITAL_GEO_KEY, longitude=longitude, latitude=latitude,
+                    radius=radius_km, unit='km', sort='ASC', count=None if required_mask else count,
+                    withdist=True
+                )
+                if required_mask:
+                    spec_mask = self._hosp_spec_mask
+                    hosp_pos = self._hosp_pos
+                    matches = [
+                        (hospital_id, distance) for hospital_id, distance in matches
+                        if spec_mask[hosp_pos[hospital_id]] & required_mask
+                    ][:count]
+                return [
+                    {**self.hospitals_by_id[hospital_id], 'distance_km': distance}
+                    for hospital_id, distance in matches
+                ]
+            except redis.RedisError as e:
+                logger.warning("⚠ Geo search failed, using in-process search: %s", e)
+        
+        return self._scan_nearby_hospitals(latitude, longitude, radius_km, count, required_mask)
+    
+    def _scan_nearby_hospitals(self, latitude, longitude, radius_km, count, required_mask=0):
+        """Haversine search, a BallTree query for large hospital sets or a pre-filtered scan otherwise"""
+        if self._hosp_tree is not None:
+            point = np.radians([[latitude, longitude]])
+            indices, distances = self._hosp_tree.query_radius(
+                point, r=radius_km / EARTH_RADIUS_KM, return_distance=True, sort_results=True
+            )
+            indices, distances = indices[0], distances[0] * EARTH_RADIUS_KM
+            if required_mask:
+                keep = (self._hosp_spec_mask[indices] & required_mask) != 0
+                indices, distances = indices[keep], distances[keep]
+            
+            return [
+                {**self.hospitals_by_id[self._hosp_ids[i]], 'distance_km': float(d)}
+                for i, d in zip(indices[:count], distances[:count])
+            ]
+        
+        distances = haversine_within(
+            np.radians(latitude), np.radians(longitude),
+            self._hosp_lat, self._hosp_lon, self._hosp_cos_lat, radius_km
+        )
+        eligible = distances <= radius_km
+        if required_mask:
+            eligible &= (self._hosp_spec_mask & required_mask) != 0
+        candidates = np.flatnonzero(eligible)
+        
+        # Partial sort, only the closest count hospitals are ordered
+        if len(candidates) > count:
+            candidates = candidates[np.argpartition(distances[candidates], count - 1)[:count]]
+        order = candidates[np.argsort(distances[candidates])]
+        
+        return [
+            {**self.hospitals_by_id[self._hosp_ids[i]], 'distance_km': float(distances[i])}
+            for i in order
+        ]
+    
+    def handle_emergency_call(self, emergency_data, current_data=None, features=None):
+        """Handle new emergency call and provide optimal response
+        
+        current_data and its preprocessed features can be passed in when already known.
+        """
+        try:
+            logger.info("🚨 Emergency Call Received: %s", emergency_data.get('call_id', 'Unknown'))
             
             # Extract emergency information
             emergency_location = (emergency_data['latitude'], emergency_data['longitude'])
             patient_condition = emergency_data.get('condition', 'general')
             priority = emergency_data.get('priority', 'high')
             
-            # Collect real-time data
-            print("📊 Collecting real-time data...")
-            current_data = self.data_collector.collect_all_data(
-                emergency_location, emergency_location  # Same location for context
-            )
+            # Collect real-time data unless the caller already has it
+            if current_data is None:
+                logger.debug("📊 Collecting real-time data...")
+                current_data = self.data_collector.collect_all_data_sync(
+                    emergency_location, emergency_location  # Same location for context
+                )
             
             # Preprocess data for ML model
-            features = self.preprocessor.preprocess_single_sample(current_data)
+            if features is None:
+                features = self.preprocessor.preprocess_single_sample(current_data)
             
             # Find optimal hospitals
-            print("🏥 Finding optimal hospitals...")
+            logger.debug("🏥 Finding optimal hospitals...")
             hospital_options = self.route_optimizer.find_optimal_hospital(
                 emergency_location, patient_condition, current_data['contextual']
             )
             
+            # Skip routing to hospitals out of dispatch range, always keeping the top option
+            lat0, lon0 = np.radians(emergency_location)
+            in_range = [
+                option for option in hospital_options[1:3]
+                if approx_km(lat0, lon0, np.radians(option['hospital']['lat']),
+                             np.radians(option['hospital']['lon'])) <= Config.MAX_DISPATCH_KM
+            ]
+            hospital_options = hospital_options[:1] + in_range
+            
             # Get route options for top 3 hospitals
             optimized_responses = []
             
@@ -141,32 +349,24 @@ class EmergencyResponseService:
                 hospital_location = (hospital['lat'], hospital['lon'])
                 
                 # Get multiple route options
-                route_options = self.route_optimizer.get_multiple_route_options(
-                    emergency_location, hospital_location, current_data['contextual']
+                route_options = self._get_route_options(emergency_location, hospital, current_data)
+                
+                # Base duration only depends on the two endpoints
+                base_duration = self.distance_calc.calculate_travel_time(
+                    emergency_location, hospital_location
+                )
+                
+                # Model inputs are the same for every route to this hospital, predict once
+                prediction = self.traffic_predictor.predict_emergency_travel_time(
+                    features, base_duration, vehicle_type='ambulance', 
+                    emergency_priority=priority
                 )
                 
-                # Predict traffic for each route
                 route_predictions = []
                 for route in route_options:
-                    # Calculate base duration
-                    base_duration = self.distance_calc.calculate_travel_time(
-                        emergency_location, hospital_location
-                    )
-                    
-                    # Predict with ML model
-                    prediction = self.traffic_predictor.predict_emergency_travel_time(
-                        features, base_duration, vehicle_type='ambulance', 
-                        emergency_priority=priority
-                    )
-                    
-                    route_stats = self.route_optimizer.calculate_route_stats(
-                        route['path'], current_data['contextual']
-                    )
-                    
                     route_prediction = {
                         'route': route,
                         'prediction': prediction,
-                        'stats': route_stats,
                         'total_response_time': prediction['travel_time'] + hospital['current_wait_time']
                     }
                     
@@ -176,6 +376,11 @@ class EmergencyResponseService:
                 best_route = min(route_predictions, 
                                key=lambda x: x['total_response_time'])
                 
+                # Path statistics are only reported for the chosen route
+                best_route['stats'] = self.route_optimizer.calculate_route_stats(
+                    best_route['route']['path'], current_data['contextual']
+                )
+                
                 optimized_response = {
                     'hospital': hospital,
                     'best_route': best_route,
@@ -190,20 +395,86 @@ class EmergencyResponseService:
                 optimized_responses, emergency_data, current_data
             )
             
-            print("✅ Optimization complete!")
+            logger.debug("✅ Optimization complete!")
             return final_recommendation
             
         except Exception as e:
-            print(f"❌ Error handling emergency call: {e}")
+            logger.error("❌ Error handling emergency call: %s", e)
             return self._generate_fallback_response(emergency_data)
     
+    def _get_route_options(self, emergency_location, hospital, current_data):
+        """Route options to a hospital, reused for nearby calls under the same conditions"""
+        contextual = current_data['contextual']
+        key = (
+            round(emergency_location[0], 3), round(emergency_location[1], 3), hospital['id'],
+            contextual['is_rush_hour'], current_data.get('weather', {}).get('weather_condition')
+        )
+        
+        with self._route_cache_lock:
+            route_options = self._route_cache.get(key)
+        
+        if route_options is None:
+            route_options = self.route_optimizer.get_multiple_route_options(
+                emergency_location, (hospital['lat'], hospital['lon']), contextual
+            )
+            with self._route_cache_lock:
+                self._route_cache[key] = route_options
+        
+        return route_options
+    
+    def handle_emergency_calls_batch(self, emergencies):
+        """Handle several emergency calls, collecting real-time data once per location"""
+        locations = []
+        for emergency in emergencies:
+            location = (emergency['latitude'], emergency['longitude'])
+            if location not in locations:
+                locations.append(location)
+        
+        logger.debug("📊 Collecting real-time data for %d location(s)...", len(locations))
+        try:
+            collected = self.data_collector.collect_many_sync(
+                [(location, location) for location in locations]
+            )
+            data_by_location = dict(zip(locations, collected))
+        except Exception as e:
+            # Each call collects its own data, and falls back on its own if that fails too
+            logger.warning("⚠ Batch data collection failed, collecting per call: %s", e)
+            data_by_location = {}
+        
+        # Model features only depend on the collected data, build them once per location
+        features_by_location = {}
+        for location, current_data in data_by_location.items():
+            try:
+                features_by_location[location] = self.preprocessor.preprocess_single_sample(current_data)
+            except Exception as e:
+                logger.warning("⚠ Preprocessing failed for %s: %s", location, e)
+        
+        # One call at a time, the route optimizer and predictor are shared and not known to be thread-safe.
+        # Missing data or features are redone inside the call, where failures give that call's fallback.
+        responses = []
+        for emergency in emergencies:
+            location = (emergency['latitude'], emergency['longitude'])
+            responses.append(self.handle_emergency_call(
+                emergency,
+                current_data=data_by_location.get(location),
+                features=features_by_location.get(location)
+            ))
+        return responses
+    
     def _generate_final_recommendation(self, optimized_responses, emergency_data, current_data):
         """Generate final recommendation with all details"""
         best_option = optimized_responses[0]
+        hospital = best_option['hospital']
+        best_route = best_option['best_route']
+        prediction = best_route['prediction']
+        route_stats = best_route['stats']
+        confidence = prediction.get('confidence', 0.8)
+        weather = current_data['weather']
+        now = datetime.now()
         
         recommendation = {
             'call_id': emergency_data.get('call_id'),
-            'timestamp': datetime.now().isoformat(),
+            'timestamp': now.isoformat(),
             'emergency_location': {
                 'latitude': emergency_data['latitude'],
                 'longitude': emergency_data['longitude'],
@@ -216,22 +487,22 @@ class EmergencyResponseService:
                 'gender': emergency_data.get('gender')
             },
             'recommended_hospital': {
-                'id': best_option['hospital']['id'],
-                'name': best_option['hospital']['name'],
+                'id': hospital['id'],
+                'name': hospital['name'],
                 'location': {
-                    'latitude': best_option['hospital']['lat'],
-                    'longitude': best_option['hospital']['lon']
+                    'latitude': hospital['lat'],
+                    'longitude': hospital['lon']
                 },
-                'specialties': best_option['hospital']['specialties'],
-                'current_wait_time': best_option['hospital']['current_wait_time']
+                'specialties': hospital['specialties'],
+                'current_wait_time': hospital['current_wait_time']
             },
             'optimal_route': {
-                'algorithm': best_option['best_route']['route']['algorithm'],
-                'coordinates': best_option['best_route']['stats']['coordinates'],
-                'distance_km': best_option['best_route']['stats']['total_distance_km'],
-                'estimated_time': best_option['best_route']['prediction']['travel_time'],
-                'time_saved': best_option['best_route']['prediction']['time_saved'],
-                'confidence': best_option['best_route']['prediction'].get('confidence', 0.8)
+                'algorithm': best_route['route']['algorithm'],
+                'coordinates': route_stats['coordinates'],
+                'distance_km': route_stats['total_distance_km'],
+                'estimated_time': prediction['travel_time'],
+                'time_saved': prediction['time_saved'],
+                'confidence': confidence
             },
             'alternative_options': [
                 {
@@ -243,19 +514,16 @@ class EmergencyResponseService:
                 for opt in optimized_responses[1:3]
             ],
             'current_conditions': {
-                'weather': current_data['weather']['weather_condition'],
+                'weather': weather['weather_condition'],
                 'traffic_level': 'Heavy' if current_data['contextual']['is_rush_hour'] else 'Moderate',
                 'incidents': len(current_data['incidents']),
-                'temperature': current_data['weather']['temperature']
+                'temperature': weather['temperature']
             },
-            'eta': (datetime.now() + timedelta(
-                minutes=best_option['best_route']['prediction']['travel_time']
-            )).isoformat(),
+            'eta': (now + timedelta(minutes=prediction['travel_time'])).isoformat(),
             'performance_metrics': {
                 'processing_time_seconds': 2.5,  # Estimated
-                'confidence_score': best_option['best_route']['prediction'].get('confidence', 0.8),
-                'route_efficiency': best_option['best_route']['prediction']['time_saved'] / 
-                                  best_option['best_route']['prediction']['normal_travel_time']
+                'confidence_score': confidence,
+                'route_efficiency': prediction['time_saved'] / prediction['normal_travel_time']
             }
         }
         
@@ -303,127 +571,196 @@ class EmergencyResponseService:
             'last_update': datetime.now().isoformat()
         }
     
-    def simulate_emergency_response(self, num_emergencies=5):
-        """Simulate multiple emergency responses for testing"""
-        print("🧪 Running Emergency Response Simulation...")
+    def _simulate_stream(self, emergencies, max_workers):
+        """Yield (emergency, response, processing_time) for each call in order, as they complete"""
+        if max_workers > 1:
+            logger.info("Simulating %d emergencies on %d workers", len(emergencies), max_workers)
+            chunksize = max(1, len(emergencies) // (max_workers * 4))
+            with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_simulation_worker) as executor:
+                outcomes = executor.map(_simulate_emergency, emergencies, chunksize=chunksize)
+                for emergency, (response, processing_time) in zip(emergencies, outcomes):
+                    yield emergency, response, processing_time
+            return
+        
+        log_progress = logger.isEnabledFor(logging.DEBUG)
+        for i, emergency in enumerate(emergencies):
+            if log_progress:
+                logger.debug("Simulating Emergency %d/%d", i + 1, len(emergencies))
+            
+            start_time = time.time()
+            response = self.handle_emergency_call(emergency)
+            yield emergency, response, time.time() - start_time
+    
+    def simulate_emergency_response(self, num_emergencies=5, max_workers=None, keep_results=None):
+        """Simulate multiple emergency responses for testing
+        
+        Large simulations run across worker processes, each with its own service;
+        max_workers=1 keeps everything in this process. Statistics are accumulated
+        as responses arrive, per-call results are only kept when keep_results is set
+        (by default for runs up to Config.SIMULATION_KEEP_RESULTS_MAX calls).
+        """
+        logger.info("🧪 Running Emergency Response Simulation...")
         
         # Generate random emergency scenarios
         emergencies = self._generate_test_emergencies(num_emergencies)
         
+        if max_workers is None:
+            max_workers = os.cpu_count() if num_emergencies >= Config.SIMULATION_PARALLEL_MIN else 1
+        max_workers = max(1, min(max_workers, num_emergencies))
+        if keep_results is None:
+            keep_results = num_emergencies <= Config.SIMULATION_KEEP_RESULTS_MAX
+        
         results = []
-        total_processing_time = 0
+        slowest = []  # min-heap of (processing_time, index, result)
+        count = successes = 0
+        mean_processing_time = m2_processing_time = 0.0
+        total_travel_time = 0.0
         
-        for i, emergency in enumerate(emergencies):
-            print(f"\nSimulating Emergency {i+1}/{num_emergencies}")
-            
-            start_time = time.time()
-            response = self.handle_emergency_call(emergency)
-            processing_time = time.time() - start_time
+        for emergency, response, processing_time in self._simulate_stream(emergencies, max_workers):
+            # Welford update of processing time mean and variance
+            count += 1
+            delta = processing_time - mean_processing_time
+            mean_processing_time += delta / count
+            m2_processing_time += delta * (processing_time - mean_processing_time)
             
-            total_processing_time += processing_time
+            if 'optimal_route' in response:
+                successes += 1
+                total_travel_time += response['optimal_route']['estimated_time']
             
-            results.append({
+            result = {
                 'emergency': emergency,
                 'response': response,
                 'processing_time': processing_time
-            })
+            }
+            if keep_results:
+                results.append(result)
+            
+            entry = (processing_time, count, result)
+            if len(slowest) < Config.SIMULATION_SLOWEST_K:
+                heapq.heappush(slowest, entry)
+            elif entry > slowest[0]:
+                heapq.heapreplace(slowest, entry)
         
         # Calculate simulation statistics
-        avg_processing_time = total_processing_time / num_emergencies
-        avg_travel_time = np.mean([
-            r['response']['optimal_route']['estimated_time'] 
-            for r in results if 'optimal_route' in r['response']
-        ])
+        avg_processing_time = mean_processing_time
+        avg_travel_time = total_travel_time / successes if successes else float('nan')
         
         simulation_summary = {
             'total_emergencies': num_emergencies,
             'avg_processing_time': avg_processing_time,
+            'std_processing_time': (m2_processing_time / count) ** 0.5 if count else 0.0,
             'avg_travel_time': avg_travel_time,
-            'success_rate': len([r for r in results if 'optimal_route' in r['response']]) / num_emergencies,
+            'success_rate': successes / num_emergencies,
+            'slowest': [result for _, _, result in sorted(slowest, reverse=True)],
             'results': results
         }
         
-        print(f"\n📊 Simulation Results:")
-        print(f"Average processing time: {avg_processing_time:.2f} seconds")
-        print(f"Average travel time: {avg_travel_time:.1f} minutes")
-        print(f"Success rate: {simulation_summary['success_rate']*100:.1f}%")
+        logger.info(
+            "📊 Simulation Results: average processing time %.2f seconds, "
+            "average travel time %.1f minutes, success rate %.1f%%",
+            avg_processing_time, avg_travel_time, simulation_summary['success_rate'] * 100
+        )
         
         return simulation_summary
     
     def _generate_test_emergencies(self, num_emergencies):
         """Generate test emergency scenarios"""
-        from config import Config
-        bounds = Config.CITY_BOUNDS
-        
         conditions = ['cardiac', 'stroke', 'trauma', 'respiratory', 'general']
         priorities = ['critical', 'high', 'medium']
         
-        emergencies = []
-        for i in range(num_emergencies):
-            emergency = {
-                'call_id': f'EMG_{datetime.now().strftime("%Y%m%d")}_{i+1:03d}',
-                'latitude': np.random.uniform(bounds['south'], bounds['north']),
-                'longitude': np.random.uniform(bounds['west'], bounds['east']),
-                'condition': np.random.choice(conditions),
-                'priority': np.random.choice(priorities),
-                'age': np.random.randint(18, 85),
-                'gender': np.random.choice(['M', 'F']),
+        now = datetime.now()
+        call_date = now.strftime("%Y%m%d")
+        call_time = now.isoformat()
+        
+        # Draw every random field for all calls at once
+        rng = self._rng
+        lats = rng.uniform(*CITY_LAT_RANGE, num_emergencies).tolist()
+        lons = rng.uniform(*CITY_LON_RANGE, num_emergencies).tolist()
+        call_conditions = rng.choice(conditions, num_emergencies).tolist()
+        call_priorities = rng.choice(priorities, num_emergencies).tolist()
+        ages = rng.integers(18, 85, num_emergencies).tolist()
+        genders = rng.choice(['M', 'F'], num_emergencies).tolist()
+        
+        emergencies = [
+            {
+                'call_id': f'EMG_{call_date}_{i+1:03d}',
+                'latitude': lats[i],
+                'longitude': lons[i],
+                'condition': call_conditions[i],
+                'priority': call_priorities[i],
+                'age': ages[i],
+                'gender': genders[i],
                 'address': f'Test Location {i+1}',
-                'call_time': datetime.now().isoformat()
+                'call_time': call_time
             }
-            emergencies.append(emergency)
+            for i in range(num_emergencies)
+        ]
         
         return emergencies
 
 # Utility classes
 class EmergencyAnalytics:
     """Analytics and reporting for emergency response performance"""
+    __slots__ = ('service', 'response_history', '_report_rows', '_report_frame')
     
     def __init__(self, emergency_service):
         self.service = emergency_service
         self.response_history = []
+        
+        # Flat (timestamp, condition, priority, estimated_time) rows for reporting,
+        # the first len(self._report_frame) of them already materialised
+        self._report_rows = []
+        self._report_frame = pd.DataFrame(
+            {'timestamp': pd.Series(dtype='datetime64[ns]'), 'condition': pd.Series(dtype=object),
+             'priority': pd.Series(dtype=object), 'estimated_time': pd.Series(dtype=float)}
+        )
     
     def log_response(self, emergency_data, response_data, actual_outcome=None):
         """Log emergency response for analysis"""
+        now = datetime.now()
         log_entry = {
-            'timestamp': datetime.now().isoformat(),
+            'timestamp': now.isoformat(),
             'emergency': emergency_data,
             'response': response_data,
             'actual_outcome': actual_outcome
         }
         self.response_history.append(log_entry)
+        
+        optimal_route = response_data.get('optimal_route')
+        self._report_rows.append((
+            now,
+            emergency_data.get('condition', 'general'),
+            emergency_data.get('priority', 'high'),
+            optimal_route['estimated_time'] if optimal_route else np.nan
+        ))
+    
+    def _get_report_frame(self):
+        """Responses logged so far as a DataFrame, only rows added since the last report are converted"""
+        n_rows = len(self._report_rows)
+        n_framed = len(self._report_frame)
+        if n_rows > n_framed:
+            new_rows = pd.DataFrame(self._report_rows[n_framed:n_rows], columns=self._report_frame.columns)
+            self._report_frame = pd.concat([self._report_frame, new_rows], ignore_index=True)
+        return self._report_frame
     
     def generate_performance_report(self, time_period_days=30):
         """Generate performance report"""
         cutoff_date = datetime.now() - timedelta(days=time_period_days)
         
-        recent_responses = [
-            r for r in self.response_history 
-            if datetime.fromisoformat(r['timestamp']) > cutoff_date
-        ]
+        frame = self._get_report_frame()
+        recent = frame[frame['timestamp'] > cutoff_date]
         
-        if not recent_responses:
+        if recent.empty:
             return "No data available for the specified time period"
         
         # Calculate metrics
-        avg_response_time = np.mean([
-            r['response']['optimal_route']['estimated_time']
-            for r in recent_responses if 'optimal_route' in r['response']
-        ])
-        
-        condition_breakdown = {}
-        for response in recent_responses:
-            condition = response['emergency']['condition']
-            condition_breakdown[condition] = condition_breakdown.get(condition, 0) + 1
-        
-        priority_breakdown = {}
-        for response in recent_responses:
-            priority = response['emergency']['priority']
-            priority_breakdown[priority] = priority_breakdown.get(priority, 0) + 1
+        avg_response_time = float(recent['estimated_time'].mean())
+        condition_breakdown = recent['condition'].value_counts(sort=False).to_dict()
+        priority_breakdown = recent['priority'].value_counts(sort=False).to_dict()
         
         report = {
             'period_days': time_period_days,
-            'total_emergencies': len(recent_responses),
+            'total_emergencies': len(recent),
             'avg_response_time_minutes': avg_response_time,
             'condition_breakdown': condition_breakdown,
             'priority_breakdown': priority_breakdown,
@@ -435,6 +772,8 @@ class EmergencyAnalytics:
 
 # Example usage and testing
 if __name__ == "__main__":
+    configure_logging(Config.LOG_LEVEL)
+    
     # Initialize emergency service
     service = EmergencyResponseService()
     
@@ -478,4 +817,6 @@ if __name__ == "__main__":
     print(f"Total emergencies: {report['total_emergencies']}")
     print(f"Average response time: {report['avg_response_time_minutes']:.1f} minutes")
     print(f"Condition breakdown: {report['condition_breakdown']}")
-    print(f"Priority breakdown: {report['priority_breakdown']}")
\ No newline at end of file
+    print(f"Priority breakdown: {report['priority_breakdown']}")
+    
+    shutdown_logging()
\ No newline at end of file
@@ -0,0 +1,59 @@
+import logging
+import logging.handlers
+import queue
+import sys
+
+# Queue handler and listener installed by configure_logging in this process
+_queue_handler = None
+_listener = None
+
+def configure_logging(level='INFO'):
+    """Send log records through a queue to a background stdout writer
+    
+    Logging threads only enqueue records, the listener thread does the writes.
+    Calling it again while configured is a no-op.
+    """
+    global _queue_handler, _listener
+    if _listener is not None:
+        return
+    
+    log_queue = queue.SimpleQueue()
+    
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(logging.Formatter('%(message)s'))
+    _listener = logging.handlers.QueueListener(log_queue, handler, respect_handler_level=True)
+    _queue_handler = logging.handlers.QueueHandler(log_queue)
+    
+    root = logging.getLogger()
+    root.setLevel(level)
+    root.addHandler(_queue_handler)
+    
+    _listener.start()
+
+def configure_worker_logging(level='INFO'):
+    """Log straight to stdout in a worker process
+    
+    Forked workers inherit the parent's queue handler but not its listener
+    thread, so records queued there would never be written.
+    """
+    global _queue_handler, _listener
+    root = logging.getLogger()
+    if _queue_handler is not None:
+        root.removeHandler(_queue_handler)
+    _queue_handler = _listener = None
+    
+    if not root.handlers:
+        handler = logging.StreamHandler(sys.stdout)
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        root.addHandler(handler)
+    root.setLevel(level)
+
+def shutdown_logging():
+    """Flush pending records and detach the queue, safe to call more than once"""
+    global _queue_handler, _listener
+    if _listener is None:
+        return
+    
+    logging.getLogger().removeHandler(_queue_handler)
+    _listener.stop()
+    _queue_handler = _listener = None
@@ -7,18 +7,50 @@ Main application entry point
 import sys
 import os
 import argparse
+import time
 from datetime import datetime
-import json
 
-# Add project root to path
-project_root = os.path.dirname(os.path.abspath(__file__))
-sys.path.append(project_root)
+import numpy as np
+import orjson
+from cachetools import TTLCache
 
-from api.emergency_service import EmergencyResponseService, EmergencyAnalytics
-from data.data_collector import DataCollector
-from data.data_preprocessor import DataPreprocessor
-from models.traffic_predictor import EmergencyTrafficPredictor
+# The project root is already sys.path[0] when this script runs, no path mutation needed
+
+# ML/service modules are imported inside the modes that use them, keeping setup fast
+from api.logging_setup import configure_logging, shutdown_logging
 from config import Config
+from model_manifest import TRAINED_MODEL_PATH, manifest_valid, write_manifest
+
+# Service shared by every mode run in this process
+_service = None
+_service_model_mtime = None
+
+# Demo traffic predictions keyed by coordinates rounded to 4 decimals (~11 m) and the
+# TRAFFIC_CACHE_TTL time bucket they were made in. Dispatch results are never cached.
+DEMO_COORD_DECIMALS = 4
+_demo_predictions = TTLCache(maxsize=512, ttl=Config.TRAFFIC_CACHE_TTL)
+
+def _model_mtime():
+    return os.path.getmtime(TRAINED_MODEL_PATH) if os.path.exists(TRAINED_MODEL_PATH) else None
+
+def _get_service():
+    """Shared EmergencyResponseService, rebuilt only when the trained models change on disk"""
+    global _service, _service_model_mtime
+    if _service is None or _model_mtime() != _service_model_mtime:
+        from api.emergency_service import EmergencyResponseService
+        _service = EmergencyResponseService()
+        # Read after construction, a first run trains and saves the models itself
+        _service_model_mtime = _model_mtime()
+    return _service
+
+def _save_results(name, results):
+    """Write results to LOG_DIR as timestamped JSON, numpy values encoded natively"""
+    os.makedirs(Config.LOG_DIR, exist_ok=True)
+    path = os.path.join(Config.LOG_DIR, f"{name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    options = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NAIVE_UTC | orjson.OPT_NON_STR_KEYS
+    with open(path, 'wb') as f:
+        f.write(orjson.dumps(results, default=str, option=options))
+    return path
 
 def setup_environment():
     """Set up required directories and check dependencies"""
@@ -34,17 +66,20 @@ def setup_environment():
         os.makedirs(directory, exist_ok=True)
         print(f"✓ Directory created/verified: {directory}")
 
-def train_models():
-    """Train ML models with synthetic data"""
+def train_models(workers=None):
+    """Train ML models with synthetic data, generated on `workers` threads (default all cores)"""
     print("🤖 Training Machine Learning Models...")
     
+    from data.data_preprocessor import DataPreprocessor
+    from models.traffic_predictor import EmergencyTrafficPredictor
+    
     # Initialize components
     preprocessor = DataPreprocessor()
     predictor = EmergencyTrafficPredictor()
     
     # Generate training data
     print("📊 Generating synthetic training data...")
-    df = preprocessor.generate_synthetic_training_data(n_samples=15000)
+    df = preprocessor.generate_synthetic_training_data(n_samples=15000, n_jobs=workers)
     print(f"Generated {len(df)} training samples")
     
     # Prepare features
@@ -67,6 +102,7 @@ def train_models():
     print("💾 Saving trained models...")
     predictor.save_models("models/trained_models/traffic_model")
     preprocessor.save_preprocessors("models/trained_models/preprocessor")
+    write_manifest()
     
     print("✅ Model training complete!")
     return metrics
@@ -76,7 +112,7 @@ def run_system_test():
     print("🧪 Running System Tests...")
     
     # Initialize service
-    service = EmergencyResponseService()
+    service = _get_service()
     
     # Test emergency scenarios
     test_scenarios = [
@@ -111,15 +147,14 @@ def run_system_test():
     
     test_results = []
     total_processing_time = 0
+    success_count = 0
     
     for i, scenario in enumerate(test_scenarios):
         print(f"\n🚨 Testing Scenario {i+1}: {scenario['condition']} emergency")
         
-        start_time = datetime.now()
+        start = time.perf_counter()
         response = service.handle_emergency_call(scenario)
-        end_time = datetime.now()
-        
-        processing_time = (end_time - start_time).total_seconds()
+        processing_time = time.perf_counter() - start
         total_processing_time += processing_time
         
         # Verify response structure
@@ -133,6 +168,7 @@ def run_system_test():
         test_results.append(test_result)
         
         if test_result['success']:
+            success_count += 1
             print(f"✅ Success - Hospital: {response['recommended_hospital']['name']}")
             print(f"   Travel time: {response['optimal_route']['estimated_time']:.1f} min")
             print(f"   Processing time: {processing_time:.2f} seconds")
@@ -140,12 +176,13 @@ def run_system_test():
             print(f"❌ Failed - Using fallback response")
     
     # Summary
-    success_rate = sum(1 for r in test_results if r['success']) / len(test_results)
+    success_rate = success_count / len(test_results)
     avg_processing_time = total_processing_time / len(test_results)
     
     print(f"\n📊 Test Summary:")
     print(f"Success rate: {success_rate*100:.1f}%")
     print(f"Average processing time: {avg_processing_time:.2f} seconds")
+    print(f"Results saved to {_save_results('test_results', test_results)}")
     
     return test_results
 
@@ -153,7 +190,7 @@ def run_performance_benchmark():
     """Run performance benchmark"""
     print("⏱️ Running Performance Benchmark...")
     
-    service = EmergencyResponseService()
+    service = _get_service()
     
     # Test with different numbers of simultaneous requests
     benchmark_sizes = [1, 5, 10, 20]
@@ -162,11 +199,9 @@ def run_performance_benchmark():
     for size in benchmark_sizes:
         print(f"\nTesting with {size} simultaneous emergencies...")
         
-        start_time = datetime.now()
+        start = time.perf_counter()
         simulation_results = service.simulate_emergency_response(num_emergencies=size)
-        end_time = datetime.now()
-        
-        total_time = (end_time - start_time).total_seconds()
+        total_time = time.perf_counter() - start
         avg_time_per_request = total_time / size
         
         results[size] = {
@@ -184,62 +219,67 @@ def run_performance_benchmark():
     for size, result in results.items():
         print(f"Size {size:2d}: {result['avg_time_per_request']:.2f}s/request, "
               f"{result['success_rate']*100:.1f}% success")
+    print(f"Results saved to {_save_results('benchmark_results', results)}")
     
     return results
 
-def create_sample_data():
-    """Create sample data files for development"""
+# is_rush_hour by hour of day: morning 7-10 and evening 17-20
+RUSH_HOUR_LUT = np.array([0] * 7 + [1] * 4 + [0] * 6 + [1] * 4 + [0] * 3, dtype=np.uint8)
+
+def create_sample_data(data_format='csv', seed=None):
+    """Create sample data files for development, traffic and weather as CSV or zstd Parquet;
+    a seed makes the generated data reproducible"""
     print("📝 Creating sample data files...")
     
     # Sample traffic data
     import pandas as pd
-    import numpy as np
     
-    # Generate sample historical traffic data
-    dates = pd.date_range(start='2024-01-01', end='2024-12-31', freq='H')
-    
-    traffic_data = []
-    for date in dates[:1000]:  # Limit to 1000 samples for demo
-        sample = {
-            'timestamp': date,
-            'hour': date.hour,
-            'day_of_week': date.weekday(),
-            'month': date.month,
-            'route_id': f"R{np.random.randint(1, 100)}",
-            'origin_lat': 12.9716 + np.random.uniform(-0.1, 0.1),
-            'origin_lon': 77.5946 + np.random.uniform(-0.1, 0.1),
-            'dest_lat': 12.9716 + np.random.uniform(-0.1, 0.1),
-            'dest_lon': 77.5946 + np.random.uniform(-0.1, 0.1),
-            'distance_km': np.random.uniform(2, 25),
-            'travel_time_min': np.random.uniform(10, 60),
-            'traffic_speed_kmh': np.random.uniform(20, 80),
-            'weather_condition': np.random.choice(['Clear', 'Rain', 'Cloudy', 'Storm']),
-            'temperature': np.random.uniform(15, 35),
-            'is_rush_hour': 1 if (7 <= date.hour <= 10) or (17 <= date.hour <= 20) else 0
-        }
-        traffic_data.append(sample)
+    def write_frame(df, stem):
+        # Parquet needs pyarrow, keeps dtypes and is several times smaller than CSV
+        if data_format == 'parquet':
+            df.to_parquet(f'data/raw/{stem}.parquet', compression='zstd', index=False)
+        else:
+            df.to_csv(f'data/raw/{stem}.csv', index=False)
     
-    traffic_df = pd.DataFrame(traffic_data)
-    traffic_df.to_csv('data/raw/traffic_data.csv', index=False)
+    # Generate sample historical traffic data
+    dates = pd.date_range(start='2024-01-01', periods=1000, freq='H')  # Limit to 1000 samples for demo
+    n = len(dates)
+    rng = np.random.default_rng(seed)
+    hours = dates.hour.to_numpy()
+    
+    # One vectorised draw per column
+    traffic_df = pd.DataFrame({
+        'timestamp': dates,
+        'hour': hours,
+        'day_of_week': dates.weekday,
+        'month': dates.month,
+        'route_id': np.char.add('R', rng.integers(1, 100, n).astype(str)),
+        'origin_lat': 12.9716 + rng.uniform(-0.1, 0.1, n),
+        'origin_lon': 77.5946 + rng.uniform(-0.1, 0.1, n),
+        'dest_lat': 12.9716 + rng.uniform(-0.1, 0.1, n),
+        'dest_lon': 77.5946 + rng.uniform(-0.1, 0.1, n),
+        'distance_km': rng.uniform(2, 25, n),
+        'travel_time_min': rng.uniform(10, 60, n),
+        'traffic_speed_kmh': rng.uniform(20, 80, n),
+        'weather_condition': rng.choice(['Clear', 'Rain', 'Cloudy', 'Storm'], n),
+        'temperature': rng.uniform(15, 35, n),
+        'is_rush_hour': RUSH_HOUR_LUT[hours]
+    })
+    write_frame(traffic_df, 'traffic_data')
     print("✓ Sample traffic data created")
     
     # Sample weather data
-    weather_data = []
-    for i in range(1000):
-        weather_sample = {
-            'timestamp': dates[i],
-            'temperature': np.random.uniform(15, 35),
-            'humidity': np.random.uniform(40, 90),
-            'pressure': np.random.uniform(1000, 1020),
-            'wind_speed': np.random.uniform(0, 15),
-            'visibility': np.random.uniform(5, 10),
-            'weather_main': np.random.choice(['Clear', 'Clouds', 'Rain', 'Thunderstorm']),
-            'is_raining': np.random.choice([0, 1], p=[0.8, 0.2])
-        }
-        weather_data.append(weather_sample)
-    
-    weather_df = pd.DataFrame(weather_data)
-    weather_df.to_csv('data/raw/weather_data.csv', index=False)
+    weather_df = pd.DataFrame({
+        'timestamp': dates,
+        'temperature': rng.uniform(15, 35, n),
+        'humidity': rng.uniform(40, 90, n),
+        'pressure': rng.uniform(1000, 1020, n),
+        'wind_speed': rng.uniform(0, 15, n),
+        'visibility': rng.uniform(5, 10, n),
+        'weather_main': rng.choice(['Clear', 'Clouds', 'Rain', 'Thunderstorm'], n),
+        'is_raining': rng.choice([0, 1], n, p=[0.8, 0.2])
+    })
+    write_frame(weather_df, 'weather_data')
     print("✓ Sample weather data created")
     
     # Hospital locations
@@ -251,21 +291,144 @@ def create_sample_data():
         {'id': 'H005', 'name': 'St. Johns Medical College', 'lat': 12.9279, 'lon': 77.6271, 'capacity': 250}
     ]
     
-    with open('data/raw/hospital_locations.csv', 'w') as f:
-        import csv
-        writer = csv.DictWriter(f, fieldnames=['id', 'name', 'lat', 'lon', 'capacity'])
-        writer.writeheader()
-        writer.writerows(hospitals)
+    pd.DataFrame(hospitals, columns=['id', 'name', 'lat', 'lon', 'capacity']).to_csv(
+        'data/raw/hospital_locations.csv', index=False
+    )
     
     print("✓ Hospital data created")
     print("✅ Sample data files created successfully!")
 
+def _demo_handle_call(service):
+    """Demo option 1: dispatch a hospital for an emergency call"""
+    print("\n🚨 Emergency Call Handler")
+    try:
+        lat = float(input("Emergency Latitude: "))
+        lon = float(input("Emergency Longitude: "))
+        condition = input("Patient Condition (cardiac/stroke/trauma/general): ") or 'general'
+        priority = input("Priority (critical/high/medium/low): ") or 'high'
+        
+        emergency = {
+            'call_id': f'DEMO_{datetime.now().strftime("%H%M%S")}',
+            'latitude': lat,
+            'longitude': lon,
+            'condition': condition,
+            'priority': priority,
+            'address': 'Demo Location'
+        }
+        
+        response = service.handle_emergency_call(emergency)
+        
+        print("\n📋 Response:")
+        print(f"Hospital: {response['recommended_hospital']['name']}")
+        print(f"Travel Time: {response['optimal_route']['estimated_time']:.1f} minutes")
+        print(f"Distance: {response['optimal_route']['distance_km']:.1f} km")
+        print(f"ETA: {response['eta']}")
+        
+    except ValueError:
+        print("❌ Invalid input. Please enter valid coordinates.")
+    except Exception as e:
+        print(f"❌ Error: {e}")
+
+def _demo_show_hospitals(service):
+    """Demo option 2: list loaded hospitals"""
+    print("\n🏥 Hospital Information")
+    hospitals = service.route_optimizer.hospitals
+    for i, hospital in enumerate(hospitals, 1):
+        print(f"{i}. {hospital['name']}")
+        print(f"   Location: {hospital['lat']:.4f}, {hospital['lon']:.4f}")
+        print(f"   Capacity: {hospital['capacity']} beds")
+        print(f"   Wait Time: {hospital['current_wait_time']} minutes")
+        print(f"   Trauma Center: {'Yes' if hospital['trauma_center'] else 'No'}")
+        print()
+
+def _demo_predict_traffic(service):
+    """Demo option 3: predict traffic between two points"""
+    print("\n🚦 Traffic Prediction")
+    try:
+        lat1 = float(input("Origin Latitude: "))
+        lon1 = float(input("Origin Longitude: "))
+        lat2 = float(input("Destination Latitude: "))
+        lon2 = float(input("Destination Longitude: "))
+        
+        origin = (round(lat1, DEMO_COORD_DECIMALS), round(lon1, DEMO_COORD_DECIMALS))
+        destination = (round(lat2, DEMO_COORD_DECIMALS), round(lon2, DEMO_COORD_DECIMALS))
+        
+        key = (origin, destination, int(time.time()) // Config.TRAFFIC_CACHE_TTL)
+        cached = _demo_predictions.get(key)
+        if cached is None:
+            # Collect data and predict
+            current_data = service.data_collector.collect_all_data_sync(
+                origin, destination, include_forecast=True
+            )
+            features = service.preprocessor.preprocess_single_sample(current_data)
+            
+            predictions = service.traffic_predictor.predict_future_traffic(features)
+            _demo_predictions[key] = (predictions, datetime.now())
+            print("\n📈 Traffic Predictions:")
+        else:
+            predictions, predicted_at = cached
+            print(f"\n📈 Traffic Predictions (cached from {predicted_at.strftime('%H:%M:%S')}):")
+        for time_ahead, pred in predictions.items():
+            print(f"{time_ahead}: {pred['prediction'][0]:.2f}x traffic multiplier")
+            print(f"   Uncertainty: ±{pred['uncertainty'][0]:.2f}")
+        
+    except ValueError:
+        print("❌ Invalid coordinates")
+    except Exception as e:
+        print(f"❌ Error: {e}")
+
+def _demo_run_simulation(service):
+    """Demo option 4: run a small simulation"""
+    print("\n🎲 Running Simulation")
+    try:
+        num_emergencies = int(input("Number of emergencies to simulate (1-10): ") or "3")
+        if 1 <= num_emergencies <= 10:
+            results = service.simulate_emergency_response(num_emergencies)
+            print(f"\n✅ Simulation completed!")
+            print(f"Average response time: {results['avg_travel_time']:.1f} minutes")
+            print(f"Success rate: {results['success_rate']*100:.1f}%")
+        else:
+            print("❌ Please enter a number between 1 and 10")
+    except ValueError:
+        print("❌ Invalid number")
+    except Exception as e:
+        print(f"❌ Error: {e}")
+
+def _demo_system_status(service):
+    """Demo option 5: print system status"""
+    print("\n📊 System Status")
+    status = service.get_system_status()
+    print(f"System Status: {status['system_status']}")
+    print(f"Models Loaded: {status['models_loaded']}")
+    print(f"Best Model: {status['best_model']}")
+    print(f"Network Nodes: {status['network_nodes']}")
+    print(f"Network Edges: {status['network_edges']}")
+    print(f"Hospitals: {status['hospitals_loaded']}")
+    print(f"Last Update: {status['last_update']}")
+
+def _demo_exit(service):
+    print("👋 Goodbye!")
+    return True
+
+def _demo_invalid(service):
+    print("❌ Invalid option. Please select 1-6.")
+
+# Menu choice -> handler; a handler returning True ends the demo
+DEMO_HANDLERS = {
+    '1': _demo_handle_call,
+    '2': _demo_show_hospitals,
+    '3': _demo_predict_traffic,
+    '4': _demo_run_simulation,
+    '5': _demo_system_status,
+    '6': _demo_exit,
+}
+
 def interactive_demo():
     """Run interactive demo"""
     print("🎮 Interactive Emergency Response Demo")
     print("="*50)
     
-    service = EmergencyResponseService()
+    service = _get_service()
     
     while True:
         print("\nOptions:")
@@ -278,107 +441,8 @@ def interactive_demo():
         
         choice = input("\nSelect option (1-6): ").strip()
         
-        if choice == '1':
-            print("\n🚨 Emergency Call Handler")
-            try:
-                lat = float(input("Emergency Latitude: "))
-                lon = float(input("Emergency Longitude: "))
-                condition = input("Patient Condition (cardiac/stroke/trauma/general): ") or 'general'
-                priority = input("Priority (critical/high/medium/low): ") or 'high'
-                
-                emergency = {
-                    'call_id': f'DEMO_{datetime.now().strftime("%H%M%S")}',
-                    'latitude': lat,
-                    'longitude': lon,
-                    'condition': condition,
-                    'priority': priority,
-                    'address': 'Demo Location'
-                }
-                
-                response = service.handle_emergency_call(emergency)
-                
-                print("\n📋 Response:")
-                print(f"Hospital: {response['recommended_hospital']['name']}")
-                print(f"Travel Time: {response['optimal_route']['estimated_time']:.1f} minutes")
-                print(f"Distance: {response['optimal_route']['distance_km']:.1f} km")
-                print(f"ETA: {response['eta']}")
-                
-            except ValueError:
-                print("❌ Invalid input. Please enter valid coordinates.")
-            except Exception as e:
-                print(f"❌ Error: {e}")
-        
-        elif choice == '2':
-            print("\n🏥 Hospital Information")
-            hospitals = service.route_optimizer.hospitals
-            for i, hospital in enumerate(hospitals, 1):
-                print(f"{i}. {hospital['name']}")
-                print(f"   Location: {hospital['lat']:.4f}, {hospital['lon']:.4f}")
-                print(f"   Capacity: {hospital['capacity']} beds")
-                print(f"   Wait Time: {hospital['current_wait_time']} minutes")
-                print(f"   Trauma Center: {'Yes' if hospital['trauma_center'] else 'No'}")
-                print()
-        
-        elif choice == '3':
-            print("\n🚦 Traffic Prediction")
-            try:
-                lat1 = float(input("Origin Latitude: "))
-                lon1 = float(input("Origin Longitude: "))
-                lat2 = float(input("Destination Latitude: "))
-                lon2 = float(input("Destination Longitude: "))
-                
-                origin = (lat1, lon1)
-                destination = (lat2, lon2)
-                
-                # Collect data and predict
-                current_data = service.data_collector.collect_all_data(origin, destination)
-                features = service.preprocessor.preprocess_single_sample(current_data)
-                
-                predictions = service.traffic_predictor.predict_future_traffic(features)
-                
-                print("\n📈 Traffic Predictions:")
-                for time_ahead, pred in predictions.items():
-                    print(f"{time_ahead}: {pred['prediction'][0]:.2f}x traffic multiplier")
-                    print(f"   Uncertainty: ±{pred['uncertainty'][0]:.2f}")
-                
-            except ValueError:
-                print("❌ Invalid coordinates")
-            except Exception as e:
-                print(f"❌ Error: {e}")
-        
-        elif choice == '4':
-            print("\n🎲 Running Simulation")
-            try:
-                num_emergencies = int(input("Number of emergencies to simulate (1-10): ") or "3")
-                if 1 <= num_emergencies <= 10:
-                    results = service.simulate_emergency_response(num_emergencies)
-                    print(f"\n✅ Simulation completed!")
-                    print(f"Average response time: {results['avg_travel_time']:.1f} minutes")
-                    print(f"Success rate: {results['success_rate']*100:.1f}%")
-                else:
-                    print("❌ Please enter a number between 1 and 10")
-            except ValueError:
-                print("❌ Invalid number")
-            except Exception as e:
-                print(f"❌ Error: {e}")
-        
-        elif choice == '5':
-            print("\n📊 System Status")
-            status = service.get_system_status()
-            print(f"System Status: {status['system_status']}")
-            print(f"Models Loaded: {status['models_loaded']}")
-            print(f"Best Model: {status['best_model']}")
-            print(f"Network Nodes: {status['network_nodes']}")
-            print(f"Network Edges: {status['network_edges']}")
-            print(f"Hospitals: {status['hospitals_loaded']}")
-            print(f"Last Update: {status['last_update']}")
-        
-        elif choice == '6':
-            print("👋 Goodbye!")
+        if DEMO_HANDLERS.get(choice, _demo_invalid)(service):
             break
-        
-        else:
-            print("❌ Invalid option. Please select 1-6.")
 
 def main():
     """Main application entry point"""
@@ -389,8 +453,15 @@ def main():
                        help='Number of training samples to generate')
     parser.add_argument('--port', type=int, default=5000, 
                        help='API server port')
+    parser.add_argument('--workers', type=int, default=None,
+                       help='Threads for synthetic training data generation (default: all cores)')
+    parser.add_argument('--format', choices=['csv', 'parquet'], default='csv',
+                       help='File format for sample traffic and weather data (parquet needs pyarrow)')
+    parser.add_argument('--seed', type=int, default=42,
+                       help='Random seed for sample data generation')
     
     args = parser.parse_args()
+    configure_logging(Config.LOG_LEVEL)
     
     print("🚨 Emergency Response Route Optimization System")
     print("=" * 60)
@@ -402,11 +473,11 @@ def main():
     try:
         if args.mode == 'setup':
             setup_environment()
-            create_sample_data()
+            create_sample_data(args.format, args.seed)
             
         elif args.mode == 'train':
             setup_environment()
-            train_models()
+            train_models(args.workers)
             
         elif args.mode == 'test':
             setup_environment()
@@ -414,18 +485,18 @@ def main():
             
         elif args.mode == 'demo':
             setup_environment()
-            # Train models if they don't exist
-            if not os.path.exists('models/trained_models/traffic_model_random_forest.pkl'):
-                print("🤖 No trained models found. Training now...")
-                train_models()
+            # Train models if they are missing or predate the current feature definitions
+            if not manifest_valid():
+                print("🤖 No up-to-date trained models found. Training now...")
+                train_models(args.workers)
             interactive_demo()
             
         elif args.mode == 'api':
             setup_environment()
-            # Train models if they don't exist
-            if not os.path.exists('models/trained_models/traffic_model_random_forest.pkl'):
-                print("🤖 No trained models found. Training now...")
-                train_models()
+            # Train models if they are missing or predate the current feature definitions
+            if not manifest_valid():
+                print("🤖 No up-to-date trained models found. Training now...")
+                train_models(args.workers)
             
             print("🚀 Starting API Server...")
             from api.app import app
@@ -441,6 +512,10 @@ def main():
         import traceback
         traceback.print_exc()
         return 1
+    finally:
+        if _service is not None:
+            _service.data_collector.close_sync()
+        shutdown_logging()
     
     return 0
 
@@ -0,0 +1,38 @@
+import hashlib
+import os
+from datetime import datetime
+
+import numpy as np
+import orjson
+
+# Trained model file whose presence and modification time mark the current models
+TRAINED_MODEL_PATH = 'models/trained_models/traffic_model_random_forest.pkl'
+
+# Written after training, records the feature definitions the models were trained on
+MODEL_MANIFEST_PATH = 'models/trained_models/manifest.json'
+
+def feature_hash():
+    """sha256 over the feature definitions: model columns, scaled columns, sample dtypes and sample kernel"""
+    # Imported here so main can check the manifest before loading the ML stack
+    from data.data_preprocessor import FEATURE_COLUMNS, NUMERICAL_FEATURES, SAMPLE_DTYPES, SAMPLE_KERNEL_HASH
+
+    dtypes = [(col, np.dtype(dtype).str) for col, dtype in SAMPLE_DTYPES.items()]
+    definition = repr((FEATURE_COLUMNS, NUMERICAL_FEATURES, dtypes, SAMPLE_KERNEL_HASH))
+    return hashlib.sha256(definition.encode()).hexdigest()
+
+def write_manifest():
+    """Record that the models on disk match the current feature definitions"""
+    manifest = {'trained_at': datetime.now().isoformat(), 'feature_hash': feature_hash()}
+    with open(MODEL_MANIFEST_PATH, 'wb') as f:
+        f.write(orjson.dumps(manifest))
+
+def manifest_valid():
+    """True when trained models exist and match the current feature definitions"""
+    if not (os.path.exists(TRAINED_MODEL_PATH) and os.path.exists(MODEL_MANIFEST_PATH)):
+        return False
+    try:
+        with open(MODEL_MANIFEST_PATH, 'rb') as f:
+            manifest = orjson.loads(f.read())
+    except (OSError, orjson.JSONDecodeError):
+        return False
+    return manifest.get('feature_hash') == feature_hash()
@@ -0,0 +1,167 @@
+import math
+import numpy as np
+from numba import njit, prange
+
+# Column layout of the rows written by generate_samples
+SAMPLE_COLUMNS = (
+    'hour', 'day_of_week', 'month',
+    'temperature', 'humidity', 'pressure', 'visibility', 'wind_speed',
+    'is_raining', 'is_snowing', 'rain_intensity', 'temp_trend', 'rain_forecast_6h',
+    'is_weekend', 'is_rush_hour', 'is_night', 'is_holiday', 'is_school_time',
+    'distance_km', 'duration_normal_min', 'historical_traffic_ratio',
+    'num_accidents', 'num_construction', 'major_incident_nearby',
+    'sin_hour', 'cos_hour', 'sin_day', 'cos_day', 'sin_month', 'cos_month',
+    'traffic_multiplier', 'duration_with_traffic', 'delay_minutes'
+)
+
+# Cyclical encodings of hour, weekday and month, indexed by the raw value
+_HOUR_ANGLE = 2 * np.pi * np.arange(24) / 24
+_DAY_ANGLE = 2 * np.pi * np.arange(7) / 7
+_MONTH_ANGLE = 2 * np.pi * np.arange(13) / 12
+
+SIN_HOUR, COS_HOUR = np.sin(_HOUR_ANGLE), np.cos(_HOUR_ANGLE)
+SIN_DAY, COS_DAY = np.sin(_DAY_ANGLE), np.cos(_DAY_ANGLE)
+SIN_MONTH, COS_MONTH = np.sin(_MONTH_ANGLE), np.cos(_MONTH_ANGLE)
+
+# Rows per independently seeded block, keeps output identical whatever the thread count
+SAMPLE_BLOCK = 1024
+
+@njit(cache=True, fastmath=True)
+def forecast_stats(temps):
+    """Mean temperature step and max of the first two forecast slots"""
+    trend = np.diff(temps).mean()
+    max_temp = temps[:2].max()
+    return trend, max_temp
+
+@njit(cache=True, fastmath=True)
+def route_bounds(o_lat, o_lon, d_lat, d_lon, margin):
+    """Bounding box (north, south, east, west) around an origin/destination pair"""
+    return (
+        max(o_lat, d_lat) + margin,
+        min(o_lat, d_lat) - margin,
+        max(o_lon, d_lon) + margin,
+        min(o_lon, d_lon) - margin
+    )
+
+@njit(cache=True)
+def haversine_within(lat0, lon0, lats, lons, cos_lats, max_km):
+    """Haversine km from (lat0, lon0) to each point, all in radians, inf where an
+    equirectangular estimate already puts the point beyond max_km (1% margin)"""
+    radius_km = 6371.0
+    cos_lat0 = math.cos(lat0)
+    out = np.empty(lats.shape[0])
+    for i in range(lats.shape[0]):
+        dx = (lons[i] - lon0) * math.cos((lats[i] + lat0) / 2)
+        dy = lats[i] - lat0
+        if radius_km * math.sqrt(dx * dx + dy * dy) > max_km * 1.01:
+            out[i] = np.inf
+            continue
+        a = math.sin(dy / 2) ** 2 + cos_lat0 * cos_lats[i] * math.sin((lons[i] - lon0) / 2) ** 2
+        out[i] = 2 * radius_km * math.asin(math.sqrt(a))
+    return out
+
+@njit("void(float32[:, ::1], int64, int64)", parallel=True, fastmath=True, cache=True,
+      boundscheck=False, error_model='numpy', nogil=True)
+def generate_samples(out, n, seed):
+    """Fill out[:n] with synthetic traffic samples laid out as SAMPLE_COLUMNS"""
+    n_blocks = (n + SAMPLE_BLOCK - 1) // SAMPLE_BLOCK
+    for block in prange(n_blocks):
+        np.random.seed(seed + block)
+        start = block * SAMPLE_BLOCK
+        stop = min(start + SAMPLE_BLOCK, n)
+        
+        for i in range(start, stop):
+            # Random time
+            hour = np.random.randint(0, 24)
+            day_of_week = np.random.randint(0, 7)
+            month = np.random.randint(1, 13)
+            
+            # Weather conditions
+            temperature = np.random.normal(25.0, 8.0)
+            humidity = np.random.uniform(40.0, 90.0)
+            is_raining = np.random.random() < 0.2
+            rain_intensity = np.random.exponential(2.0) if is_raining else 0.0
+            visibility = np.random.uniform(5.0, 10.0) if is_raining else 10.0
+            wind_speed = np.random.exponential(3.0)
+            
+            # Contextual features
+            is_weekend = day_of_week >= 5
+            is_rush_hour = (7 <= hour <= 10) or (17 <= hour <= 20)
+            is_night = hour >= 22 or hour <= 6
+            is_holiday = np.random.random() < 0.05
+            is_school_time = (not is_weekend) and 7 <= hour <= 17 and (not is_holiday)
+            
+            # Route features
+            distance_km = np.random.uniform(2.0, 25.0)
+            base_duration = distance_km * np.random.uniform(2.0, 4.0)
+            
+            # Incidents
+            num_accidents = np.random.poisson(0.1)
+            num_construction = np.random.poisson(0.05)
+            major_incident_nearby = num_accidents > 0 and np.random.random() < 0.3
+            
+            # Traffic multiplier
+            traffic_multiplier = 1.0
+            if is_rush_hour:
+                traffic_multiplier *= np.random.uniform(1.5, 2.5)
+            elif is_night:
+                traffic_multiplier *= np.random.uniform(0.7, 0.9)
+            if is_raining:
+                traffic_multiplier *= np.random.uniform(1.2, 1.8)
+                if rain_intensity > 5:
+                    traffic_multiplier *= np.random.uniform(1.3, 2.0)
+            if is_weekend and not is_rush_hour:
+                traffic_multiplier *= np.random.uniform(0.8, 1.1)
+            if is_holiday:
+                traffic_multiplier *= np.random.uniform(0.6, 0.9)
+            if major_incident_nearby:
+                traffic_multiplier *= np.random.uniform(1.5, 2.5)
+            elif num_accidents > 0:
+                traffic_multiplier *= np.random.uniform(1.2, 1.6)
+            if num_construction > 0:
+                traffic_multiplier *= np.random.uniform(1.1, 1.4)
+            traffic_multiplier *= np.random.uniform(0.9, 1.1)
+            
+            duration_with_traffic = base_duration * traffic_multiplier
+            
+            out[i, 0] = hour
+            out[i, 1] = day_of_week
+            out[i, 2] = month
+            out[i, 3] = temperature
+            out[i, 4] = humidity
+            out[i, 5] = np.random.normal(1013.0, 10.0)  # pressure
+            out[i, 6] = visibility
+            out[i, 7] = wind_speed
+            out[i, 8] = is_raining
+            out[i, 9] = 0  # is_snowing, rare in most Indian cities
+            out[i, 10] = rain_intensity
+            out[i, 11] = np.random.normal(0.0, 1.0)  # temp_trend
+            out[i, 12] = is_raining or np.random.random() < 0.1  # rain_forecast_6h
+            out[i, 13] = is_weekend
+            out[i, 14] = is_rush_hour
+            out[i, 15] = is_night
+            out[i, 16] = is_holiday
+            out[i, 17] = is_school_time
+            out[i, 18] = distance_km
+            out[i, 19] = base_duration
+            out[i, 20] = traffic_multiplier  # historical_traffic_ratio
+            out[i, 21] = num_accidents
+            out[i, 22] = num_construction
+            out[i, 23] = major_incident_nearby
+            out[i, 24] = SIN_HOUR[hour]
+            out[i, 25] = COS_HOUR[hour]
+            out[i, 26] = SIN_DAY[day_of_week]
+            out[i, 27] = COS_DAY[day_of_week]
+            out[i, 28] = SIN_MONTH[month]
+            out[i, 29] = COS_MONTH[month]
+            out[i, 30] = traffic_multiplier
+            out[i, 31] = duration_with_traffic
+            out[i, 32] = duration_with_traffic - base_duration
+
+def warm_up():
+    """Compile kernels up front so the first request pays no JIT cost"""
+    forecast_stats(np.zeros(4, dtype=np.float64))
+    route_bounds(0.0, 0.0, 0.0, 0.0, 0.01)
+    haversine_within(0.0, 0.0, np.zeros(1), np.zeros(1), np.ones(1), 1.0)
+
+warm_up()
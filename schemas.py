@@ -0,0 +1,36 @@
+from typing import Optional, Union
+import msgspec
+
+# Request bodies, decoded and validated in a single pass by msgspec
+
+class EmergencyIn(msgspec.Struct, omit_defaults=True):
+    """POST /api/emergency"""
+    latitude: float
+    longitude: float
+    call_id: Optional[str] = None
+    condition: Optional[str] = None
+    priority: Optional[str] = None
+    age: Optional[int] = None
+    gender: Optional[str] = None
+    address: Optional[str] = None
+    call_time: Optional[str] = None
+
+class LocationIn(msgspec.Struct):
+    """POST /api/ambulance/location"""
+    ambulance_id: Union[str, int]
+    latitude: float
+    longitude: float
+
+class Point(msgspec.Struct):
+    lat: float
+    lon: float
+
+class RouteIn(msgspec.Struct):
+    """POST /api/predict/traffic and /api/routes/optimize"""
+    origin: Point
+    destination: Point
+    vehicle_type: str = 'ambulance'
+
+class SimulationIn(msgspec.Struct):
+    """POST /api/simulate"""
+    num_emergencies: int = 5
@@ -0,0 +1,23 @@
+"""
+Background jobs executed by RQ workers.
+Start a worker with: rq worker simulations --url $REDIS_URL
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.emergency_service import EmergencyResponseService
+
+# One service per worker process, built on first job
+_service = None
+
+def _get_service():
+    global _service
+    if _service is None:
+        _service = EmergencyResponseService()
+    return _service
+
+def simulate_emergency_response(num_emergencies):
+    """Run an emergency response simulation inside a worker"""
+    return _get_service().simulate_emergency_response(num_emergencies)